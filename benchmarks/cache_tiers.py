@@ -0,0 +1,57 @@
+"""Задержка попадания в кэш: каждый уровень отдельно и двухуровневый кэш."""
+import argparse
+import tempfile
+import time
+
+from common import setup
+
+
+def measure(cache, rounds, value):
+    cache.set('fragment', value, None)
+    cache.get('fragment')
+    start = time.perf_counter()
+    for _ in range(rounds):
+        cache.get('fragment')
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rounds', type=int, default=5000)
+    parser.add_argument('--size', type=int, default=20000)
+    args = parser.parse_args()
+    setup()
+    from django.core.cache.backends.filebased import FileBasedCache
+    from django.core.cache.backends.locmem import LocMemCache
+    from django.test import override_settings
+
+    from core.cache_backends import TwoTierCache
+
+    directory = tempfile.mkdtemp()
+    shared = {
+        'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory,
+        },
+    }
+    value = 'x' * args.size
+    with override_settings(CACHES=shared):
+        backends = {
+            'LocMemCache': LocMemCache('bench', {}),
+            'FileBasedCache': FileBasedCache(directory, {}),
+            'TwoTierCache, локальное попадание': TwoTierCache(
+                'shared', {'OPTIONS': {'LOCAL_TIMEOUT': 60}}
+            ),
+            'TwoTierCache, сверка версии': TwoTierCache(
+                'shared', {'OPTIONS': {'LOCAL_TIMEOUT': 0}}
+            ),
+        }
+        print(f'get() значения {args.size} байт, {args.rounds} раз')
+        for name, cache in backends.items():
+            seconds = measure(cache, args.rounds, value)
+            print(f'  {name:<40} {seconds * 1e6:10.2f} мкс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""Общая обвязка для бенчмарков: Django на временной базе в памяти.
+
+Запуск из корня репозитория: python benchmarks/<имя>.py --help
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+PROJECT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'yatube'
+)
+
+
+def setup():
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    import django
+    django.setup()
+    from django.db import connection
+    from django.test.utils import override_settings, setup_test_environment
+
+    from core.testing import test_settings
+    setup_test_environment()
+    # Кэш и метрики — во временном каталоге, как в тестах: замеры не
+    # должны ни читать, ни стирать кэш запущенного сайта.
+    directory = tempfile.mkdtemp()
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    override_settings(**test_settings(directory)).enable()
+    connection.creation.create_test_db(verbosity=0)
+
+
+@contextmanager
+def timer(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
+
+
+def report(title, rows):
+    print(title)
+    for name, seconds in rows.items():
+        print(f'  {name:<40} {seconds * 1000:10.2f} ms')
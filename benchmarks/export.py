@@ -0,0 +1,78 @@
+"""Выгрузка автора: пик памяти потоковой выгрузки против списка в памяти.
+
+Пик меряется tracemalloc для двух объёмов: у потока он не должен расти
+вместе с числом постов.
+"""
+import argparse
+import tracemalloc
+
+from common import setup, timer
+
+
+def fill(author, posts, offset):
+    from posts.models import Post
+    Post.objects.bulk_create(
+        Post(author=author, text=f'Пост номер {offset + num} ' * 10)
+        for num in range(posts)
+    )
+
+
+def in_memory(author):
+    import json
+
+    from posts.models import Post
+    rows = [
+        {'type': 'post', 'id': post.pk, 'author': author.username,
+         'text': post.text, 'pub_date': post.pub_date.isoformat()}
+        for post in Post.objects.filter(author=author).order_by('pk')
+    ]
+    return ''.join(json.dumps(row) + '\n' for row in rows).encode()
+
+
+def streaming(author, gzip=False):
+    from posts import exporting
+    size = 0
+    for chunk in exporting.export(author, 'jsonl', gzip):
+        size += len(chunk)
+    return size
+
+
+def measure(results, name, function):
+    tracemalloc.start()
+    with timer(results, name):
+        function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, nargs=2, default=[20000, 100000])
+    args = parser.parse_args()
+    setup()
+    from posts.models import User
+
+    author = User.objects.create(username='bench')
+    filled = 0
+    for posts in sorted(args.posts):
+        fill(author, posts - filled, filled)
+        filled = posts
+        results, peaks = {}, {}
+        cases = {
+            'список в памяти': lambda: in_memory(author),
+            'поток': lambda: streaming(author),
+            'поток с gzip': lambda: streaming(author, gzip=True),
+        }
+        for name, function in cases.items():
+            peaks[name] = measure(results, name, function)
+        print(f'{posts} постов')
+        for name, seconds in results.items():
+            print(
+                f'  {name:<20} {seconds * 1000:10.2f} ms '
+                f'{peaks[name] / 2 ** 20:8.1f} МБ пик'
+            )
+
+
+if __name__ == '__main__':
+    main()
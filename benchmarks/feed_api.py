@@ -0,0 +1,84 @@
+"""Лента в HTML против JSON API: запросы в секунду через тестовый клиент.
+
+Перед каждым «холодным» запросом кэш очищается, чтобы сравнивать саму
+сборку ответа; отдельно меряются тёплый кэш фрагментов HTML и повторный
+запрос к API с If-None-Match.
+"""
+import argparse
+
+from common import setup, timer
+
+LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+
+
+def fill(posts):
+    from posts.models import Group, Post, User
+    author = User.objects.create(username='bench', first_name='Автор')
+    group = Group.objects.create(title='Группа', slug='bench')
+    Post.objects.bulk_create(
+        Post(author=author, group=group, text=f'Пост номер {num} ' * 20)
+        for num in range(posts)
+    )
+
+
+def throughput(results, name, requests, get):
+    get()
+    with timer(results, name):
+        for _ in range(requests):
+            response = get()
+    assert response.status_code in (200, 304), response.status_code
+    return len(response.content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    setup()
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    fill(args.posts)
+    client = Client()
+    html, api = reverse('posts:index'), reverse('posts:api_index')
+
+    def cold(*params):
+        cache.clear()
+        return client.get(*params)
+
+    results, sizes = {}, {}
+    with override_settings(CACHES=LOCMEM):
+        cursor = client.get(api).json()['next']
+        cases = {
+            'HTML, без кэша': lambda: cold(html),
+            'HTML, тёплый кэш фрагментов': lambda: client.get(html),
+            'JSON': lambda: cold(api),
+            'JSON, вторая страница по курсору': (
+                lambda: cold(api, {'cursor': cursor})
+            ),
+            'JSON, ?fields=id,pub_date': (
+                lambda: cold(api, {'fields': 'id,pub_date'})
+            ),
+        }
+        for name, get in cases.items():
+            sizes[name] = throughput(results, name, args.requests, get)
+        etag = client.get(api)['ETag']
+        name = 'JSON, If-None-Match → 304'
+        sizes[name] = throughput(
+            results, name, args.requests,
+            lambda: client.get(api, HTTP_IF_NONE_MATCH=etag),
+        )
+    print(f'{args.posts} постов, {args.requests} запросов')
+    for name, seconds in results.items():
+        print(
+            f'  {name:<36} {args.requests / seconds:8.0f} зап/с '
+            f'{sizes[name]:8} байт'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Стоимость записи и чтения ленты подписок при разном распределении
+подписчиков: чистый push против гибрида push/pull."""
+import argparse
+
+from common import report, setup, timer
+
+
+def build(followers, authors):
+    from posts import counters
+    from posts.models import Follow, User
+    User.objects.bulk_create(
+        User(username=f'reader{num}') for num in range(followers)
+    )
+    User.objects.bulk_create(
+        User(username=f'writer{num}') for num in range(authors)
+    )
+    readers = list(User.objects.filter(username__startswith='reader'))
+    writers = list(User.objects.filter(username__startswith='writer'))
+    star, ordinary = writers[0], writers[1:]
+    follows = [Follow(user=reader, author=star) for reader in readers]
+    follows += [
+        Follow(user=reader, author=ordinary[num % len(ordinary)])
+        for num, reader in enumerate(readers)
+    ]
+    Follow.objects.bulk_create(follows)
+    # bulk_create не шлёт сигналов: число подписчиков, по которому автор
+    # попадает в pull, считается отдельно.
+    counters.recount_users([star.pk, *(writer.pk for writer in ordinary)])
+    return readers[0], star, ordinary
+
+
+def run(followers, authors, posts, threshold):
+    from django.db import transaction
+    from django.test import Client, override_settings
+    from posts import timeline
+    from posts.models import Post, TimelineEntry
+
+    results = {}
+    with transaction.atomic():
+        reader, star, ordinary = build(followers, authors)
+        timeline.rebuild(reader.pk)
+        # Раздачу постов по лентам делает воркер очереди; здесь она идёт
+        # прямо в запросе, иначе замер показал бы одну постановку задачи.
+        with override_settings(
+            FEED_PULL_THRESHOLD=threshold, JOBS_EAGER=True
+        ):
+            with timer(results, f'{posts} постов популярного автора'):
+                for num in range(posts):
+                    Post.objects.create(author=star, text=f'star {num}')
+            with timer(results, f'{posts} постов обычных авторов'):
+                for num in range(posts):
+                    Post.objects.create(
+                        author=ordinary[num % len(ordinary)], text=str(num)
+                    )
+            client = Client()
+            client.force_login(reader)
+            client.get('/follow/')
+            with timer(results, 'чтение первой страницы /follow/'):
+                client.get('/follow/')
+        entries = TimelineEntry.objects.count()
+        transaction.set_rollback(True)
+    report(
+        f'порог {threshold}: подписчиков {followers}, '
+        f'строк в лентах {entries}', results
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--followers', type=int, default=2000)
+    parser.add_argument('--authors', type=int, default=50)
+    parser.add_argument('--posts', type=int, default=20)
+    args = parser.parse_args()
+    setup()
+    for threshold in (args.followers * 10, args.followers // 2):
+        run(args.followers, args.authors, args.posts, threshold)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Время и пиковая память обработки одной загрузки фотографии.
+
+Сравнивает полное декодирование с уменьшением (как без draft) и
+posts.images.normalize. Каждый замер идёт в отдельном процессе, память —
+прирост ru_maxrss, то есть включает буферы Pillow, которые не видит
+tracemalloc.
+"""
+import argparse
+import multiprocessing
+import resource
+import time
+from io import BytesIO
+
+from common import setup
+
+
+def camera_jpeg(width, height):
+    from PIL import Image
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.effect_noise((width, height), 64).convert('RGB').save(
+        buffer, 'JPEG', quality=92, exif=exif
+    )
+    return buffer.getvalue()
+
+
+def naive(data):
+    from django.conf import settings
+    from PIL import Image, ImageOps
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        edge = settings.POST_IMAGE_MAX_EDGE
+        image.thumbnail((edge, edge))
+        image.save(BytesIO(), 'JPEG', quality=settings.POST_IMAGE_QUALITY)
+
+
+def pipeline(data):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from posts.images import normalize
+    normalize(SimpleUploadedFile('photo.jpg', data, 'image/jpeg')).close()
+
+
+def measure(func, data, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    func(data)
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+    queue.put((seconds, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--width', type=int, default=6000)
+    parser.add_argument('--height', type=int, default=4000)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+    setup()
+    data = camera_jpeg(args.width, args.height)
+    context = multiprocessing.get_context('fork')
+    print(
+        f'JPEG {args.width}×{args.height}, {len(data) / 2 ** 20:.1f} МБ, '
+        f'лучшее из {args.rounds}'
+    )
+    for name, func in (('полное декодирование', naive),
+                       ('normalize', pipeline)):
+        results = []
+        for _ in range(args.rounds):
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(func, data, queue))
+            process.start()
+            results.append(queue.get())
+            process.join()
+        seconds = min(seconds for seconds, _ in results)
+        peak = min(peak for _, peak in results)
+        print(f'  {name:<40} {seconds * 1000:10.2f} ms {peak / 1024:8.1f} МБ')
+
+
+if __name__ == '__main__':
+    main()
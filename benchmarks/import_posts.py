@@ -0,0 +1,56 @@
+"""Импорт постов: Post.objects.create по одному против import_posts.
+
+По умолчанию 100 000 постов; по одному вставляется только --create-rows
+из них, а время пересчитывается на весь объём.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from common import report, setup, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--create-rows', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+    setup()
+    from io import StringIO
+
+    from django.core.management import call_command
+
+    from posts.models import Post, User
+
+    author = User.objects.create(username='bench')
+    results = {}
+    with timer(results, f'objects.create, {args.create_rows} постов'):
+        for num in range(args.create_rows):
+            Post.objects.create(author=author, text=f'Пост {num}')
+    per_row = results[f'objects.create, {args.create_rows} постов'] / (
+        args.create_rows
+    )
+    results[f'objects.create, оценка на {args.posts}'] = per_row * args.posts
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            for num in range(args.posts):
+                record = {
+                    'id': 10 ** 7 + num, 'author': 'bench',
+                    'text': f'Пост со старой платформы {num}',
+                    'pub_date': '2015-03-01T10:00:00+00:00',
+                }
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        with timer(results, f'import_posts, {args.posts} постов'):
+            call_command(
+                'import_posts', path, f'--batch-size={args.batch_size}',
+                '--checkpoint', os.path.join(directory, 'progress.json'),
+                stdout=StringIO(),
+            )
+    report('Импорт постов', results)
+
+
+if __name__ == '__main__':
+    main()
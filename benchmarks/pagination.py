@@ -0,0 +1,60 @@
+"""Навигация по страницам: номер на каждую страницу против окна.
+
+Рендерится только includes/paginator.html для страницы из середины
+ленты; прежний шаблон, выводивший paginator.page_range целиком, взят
+как есть. По умолчанию 100 000 постов по 10 на страницу.
+"""
+import argparse
+
+from common import report, setup, timer
+
+FULL_RANGE = '''
+<ul class="pagination">
+  {% for i in page_obj.paginator.page_range %}
+      {% if page_obj.number == i %}
+        <li class="page-item active">
+          <span class="page-link">{{ i }}</span>
+        </li>
+      {% else %}
+        <li class="page-item">
+          <a class="page-link" href="?{{ page_query }}page={{ i }}">{{ i }}</a>
+        </li>
+      {% endif %}
+  {% endfor %}
+</ul>
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--per-page', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    setup()
+    from django.core.paginator import Paginator
+    from django.template import engines
+
+    engine = engines['django']
+    paginator = Paginator(range(args.posts), args.per_page)
+    context = {
+        'page_obj': paginator.page(paginator.num_pages // 2),
+        'page_query': '',
+    }
+    templates = {
+        'все номера страниц': engine.from_string(FULL_RANGE),
+        'окно вокруг текущей': engine.get_template('includes/paginator.html'),
+    }
+    results, sizes = {}, {}
+    for name, template in templates.items():
+        with timer(results, f'{name}, {args.repeat} рендеров'):
+            for _ in range(args.repeat):
+                html = template.render(context)
+        sizes[name] = len(html.encode())
+    report(f'{paginator.num_pages} страниц', results)
+    for name, size in sizes.items():
+        print(f'  {name:<40} {size:10} байт')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Поиск по постам: LIKE '%слово%' (прежний поиск админки) против FTS5.
+
+По умолчанию 1 000 000 постов; вставка идёт пачками через executemany,
+индекс наполняется триггерами.
+"""
+import argparse
+import random
+
+from common import report, setup, timer
+
+WORDS = (
+    'котики собаки прогулка погода город река лес книга музыка кино '
+    'работа отпуск море горы дорога поезд утро вечер друзья семья'
+).split()
+
+
+def fill(posts, batch):
+    from django.db import connection
+    from django.utils import timezone
+
+    from posts.models import User
+    author = User.objects.create(username='bench')
+    now = timezone.now()
+    rng = random.Random(1)
+    with connection.cursor() as cursor:
+        for start in range(0, posts, batch):
+            rows = [
+                (' '.join(rng.choices(WORDS, k=30)) + f' пост{num}',
+                 now, author.pk, 0, '', '', '', '')
+                for num in range(start, min(start + batch, posts))
+            ]
+            cursor.executemany(
+                'INSERT INTO posts_post (text, pub_date, author_id, '
+                'comments_count, image_format, image_hash, '
+                'image_placeholder, image_color) '
+                'VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
+                rows,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=10000)
+    args = parser.parse_args()
+    setup()
+    from django.core.paginator import Paginator
+
+    from posts import search
+    from posts.models import Post
+
+    results = {}
+    with timer(results, f'вставка {args.posts} постов с индексом'):
+        fill(args.posts, args.batch)
+    rare = f'пост{args.posts // 2}'
+    for query in ('котики', rare):
+        with timer(results, f'LIKE «{query}», COUNT и первые 10'):
+            rows = Post.objects.filter(text__icontains=query)
+            rows.count()
+            list(rows[:10])
+        with timer(results, f'FTS5 «{query}», COUNT и первые 10'):
+            list(Paginator(search.SearchResults(query), 10).page(1))
+    with timer(results, 'FTS5 «котики», 100-я страница'):
+        list(Paginator(search.SearchResults('котики'), 10).page(100))
+    with timer(results, 'rebuild_search_index'):
+        search.rebuild()
+    report(f'{args.posts} постов', results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Цена замера Server-Timing и метрик на запрос главной страницы.
+
+Сравниваются оба middleware выключенными, только метрики, метрики с
+Server-Timing без выборки (SERVER_TIMING_SAMPLE_RATE = 0) и замер
+каждого запроса.
+"""
+import argparse
+
+from common import report, setup, timer
+
+CONFIGS = {
+    'выключено': {'SERVER_TIMING_ENABLED': False, 'METRICS_ENABLED': False},
+    'только метрики': {'SERVER_TIMING_ENABLED': False},
+    'метрики, выборка 0%': {'SERVER_TIMING_SAMPLE_RATE': 0},
+    'метрики, выборка 100%': {'SERVER_TIMING_SAMPLE_RATE': 1},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    setup()
+    import logging
+
+    from django.contrib.auth import get_user_model
+    from django.test import Client, override_settings
+
+    from posts.models import Post
+
+    author = get_user_model().objects.create(username='author')
+    Post.objects.bulk_create(
+        Post(author=author, text=f'Пост {number}')
+        for number in range(args.posts)
+    )
+    # Строки лога формируются, как в продакшене, но не печатаются.
+    logging.getLogger('core.middleware').handlers = [logging.NullHandler()]
+    results = {}
+    for name, options in CONFIGS.items():
+        with override_settings(**options):
+            client = Client()
+            client.get('/')
+            with timer(results, f'{name}, {args.requests} запросов'):
+                for _ in range(args.requests):
+                    client.get('/')
+    report('Главная страница из кэша фрагментов', results)
+
+
+if __name__ == '__main__':
+    main()
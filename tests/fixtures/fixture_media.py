@@ -0,0 +1,20 @@
+import pytest
+
+from core.metrics import REGISTRY
+from core.testing import test_settings as _test_settings
+
+
+@pytest.fixture(autouse=True)
+def eager_jobs(settings):
+    # Воркеров очереди в тестах нет: миниатюры и раздача постов по лентам
+    # должны выполняться прямо в запросе.
+    settings.JOBS_EAGER = True
+
+
+@pytest.fixture(autouse=True)
+def test_settings(settings, tmp_path):
+    # Те же настройки, что ставит manage.py test (core.testing.TestRunner).
+    for name, value in _test_settings(str(tmp_path)).items():
+        setattr(settings, name, value)
+    yield
+    REGISTRY.flush()
@@ -0,0 +1,9 @@
+import pytest
+
+from core.testing import query_budget as _query_budget
+
+
+@pytest.fixture
+def query_budget(db):
+    """Контекстный менеджер: `with query_budget(5): client.get(url)`."""
+    return _query_budget
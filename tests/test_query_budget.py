@@ -0,0 +1,63 @@
+import pytest
+from django.core.cache import cache
+
+from posts.models import Comment, Follow, Post
+
+pytestmark = [pytest.mark.django_db]
+
+# Бюджеты с учётом двух запросов авторизации (сессия и пользователь) и
+# точек сохранения транзакций; от числа постов и комментариев не зависят.
+BUDGETS = {
+    'index': ('get', '/', 3),
+    'group_posts': ('get', '/group/{group}/', 4),
+    'profile': ('get', '/profile/{author}/', 4),
+    'post_detail': ('get', '/posts/{post}/', 4),
+    'post_create': ('get', '/create/', 5),
+    'post_edit': ('get', '/posts/{post}/edit/', 6),
+    'add_comment': ('post', '/posts/{post}/comment/', 7),
+    'follow_index': ('get', '/follow/', 4),
+    'profile_follow': ('get', '/profile/{author}/follow/', 6),
+    'profile_unfollow': ('get', '/profile/{author}/unfollow/', 11),
+    'profile_export': ('get', '/profile/{user}/export/', 5),
+    'search': ('get', '/search/', 5),
+    'api_index': ('get', '/api/posts/', 1),
+    'api_group_posts': ('get', '/api/group/{group}/posts/', 2),
+    'api_profile': ('get', '/api/profile/{author}/posts/', 2),
+    'api_follow_index': ('get', '/api/follow/posts/', 4),
+}
+
+
+@pytest.fixture
+def feed(mixer, user, group):
+    authors = mixer.cycle(10).blend('auth.User')
+    for author in authors:
+        Follow.objects.create(user=user, author=author)
+        mixer.blend(Post, author=author, group=group, image=None)
+    post = mixer.blend(Post, author=user, group=group, image=None)
+    for author in authors:
+        Comment.objects.create(post=post, author=author, text='Комментарий')
+    cache.clear()
+    return {
+        'group': group.slug, 'author': authors[0].username, 'post': post.pk,
+        'user': user.username,
+    }
+
+
+@pytest.mark.parametrize('view_name', BUDGETS)
+def test_view_query_budget(user_client, feed, query_budget, view_name):
+    method, url, budget = BUDGETS[view_name]
+    with query_budget(budget):
+        response = getattr(user_client, method)(
+            url.format(**feed), {'text': 'Комментарий', 'q': 'Комментарий'}
+        )
+        if response.streaming:
+            b''.join(response.streaming_content)
+    assert response.status_code in (200, 302), (
+        f'Страница `{url}` отвечает кодом {response.status_code}'
+    )
+
+
+def test_every_view_has_budget():
+    from posts.urls import urlpatterns
+    missing = {pattern.name for pattern in urlpatterns} - BUDGETS.keys()
+    assert not missing, f'Нет бюджета запросов для: {", ".join(missing)}'
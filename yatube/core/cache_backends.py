@@ -0,0 +1,287 @@
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+from . import timing
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """Локальный LRU процесса перед общим для всех воркеров кэшем.
+
+    LOCATION — алиас общего кэша из CACHES. Каждая запись в общем кэше
+    сопровождается ключом версии; локальная копия отдаётся без обращений
+    к общему кэшу LOCAL_TIMEOUT секунд, а затем сверяется с версией —
+    так изменения из соседних процессов видны не позже чем через
+    LOCAL_TIMEOUT, а неизменные значения не перечитываются целиком.
+    Ключи с префиксами из SHARED_ONLY (например, поколения лент, по
+    которым сбрасывается кэш) локально не хранятся вовсе.
+
+    get_many() обращается к общему кэшу не по ключу, а пачкой.
+
+    incr() — чтение и запись под блокировкой, взятой через add() общего
+    кэша, поэтому одновременные сдвиги из разных процессов не теряются.
+
+        'default': {
+            'BACKEND': 'core.cache_backends.TwoTierCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'MAX_ENTRIES': 1000, 'LOCAL_TIMEOUT': 1,
+                'SHARED_ONLY': ['feed-generation:'],
+            },
+        }
+    """
+    # Блокировка incr снимается сама, если её владелец упал.
+    INCR_LOCK_TIMEOUT = 5
+    INCR_LOCK_POLL = 0.005
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 1))
+        self.shared_only = tuple(options.get('SHARED_ONLY', ()))
+        self._shared_alias = location
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    @staticmethod
+    def _version_key(key):
+        return f'{key}:version'
+
+    def _is_local(self, key):
+        return not (self.shared_only and key.startswith(self.shared_only))
+
+    def _remember(self, key, stamp, expires_at, value):
+        with self._lock:
+            self._local[key] = (
+                value, stamp, time.monotonic() + self.local_timeout,
+                expires_at,
+            )
+            self._local.move_to_end(key)
+            while len(self._local) > self._max_entries:
+                self._local.popitem(last=False)
+
+    def _forget(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _local_get(self, key, version):
+        """Локальная копия, если она свежая или её версия не менялась."""
+        local_key = self.make_key(key, version)
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is not None:
+                self._local.move_to_end(local_key)
+        if entry is None:
+            return None
+        value, stamp, checked_until, expires_at = entry
+        if expires_at is not None and time.time() >= expires_at:
+            self._forget(local_key)
+            return None
+        if time.monotonic() < checked_until:
+            return entry
+        current = self.shared.get(self._version_key(key), version=version)
+        if current != stamp:
+            self._forget(local_key)
+            return None
+        self._remember(local_key, stamp, expires_at, value)
+        return entry
+
+    def _envelope(self, value, timeout):
+        return uuid4().hex, self.get_backend_timeout(timeout), value
+
+    def get(self, key, default=None, version=None):
+        if timing.current() is None:
+            return self._get(key, default, version)
+        start = time.perf_counter()
+        value = self._get(key, _MISSING, version)
+        timing.cache_lookup(
+            value is not _MISSING, (time.perf_counter() - start) * 1000
+        )
+        return default if value is _MISSING else value
+
+    def _get(self, key, default, version):
+        local = self._is_local(key)
+        entry = self._local_get(key, version) if local else None
+        if entry is not None:
+            return entry[0]
+        envelope = self.shared.get(key, version=version)
+        if envelope is None:
+            return default
+        stamp, expires_at, value = envelope
+        if local:
+            self._remember(
+                self.make_key(key, version), stamp, expires_at, value
+            )
+        return value
+
+    def get_many(self, keys, version=None):
+        """Свежие локальные копии, остальное — двумя get_many общего кэша.
+
+        Первый сверяет версии устаревших локальных копий, второй читает
+        ключи, которых локально нет или чья версия сменилась.
+        """
+        start = time.perf_counter()
+        keys = list(keys)
+        found, stale, missing = self._local_many(keys, version)
+        if stale:
+            versions = self.shared.get_many(
+                [self._version_key(key) for key in stale], version=version
+            )
+            for key, (value, stamp, _, expires_at) in stale.items():
+                local_key = self.make_key(key, version)
+                if versions.get(self._version_key(key)) == stamp:
+                    self._remember(local_key, stamp, expires_at, value)
+                    found[key] = value
+                else:
+                    self._forget(local_key)
+                    missing.append(key)
+        if missing:
+            envelopes = self.shared.get_many(missing, version=version)
+            for key, (stamp, expires_at, value) in envelopes.items():
+                if self._is_local(key):
+                    self._remember(
+                        self.make_key(key, version), stamp, expires_at, value
+                    )
+                found[key] = value
+        if timing.current() is not None and keys:
+            # Время делится между попаданиями и промахами поровну на ключ.
+            duration = (time.perf_counter() - start) * 1000 / len(keys)
+            hits, misses = len(found), len(keys) - len(found)
+            if hits:
+                timing.cache_lookup(True, duration * hits, hits)
+            if misses:
+                timing.cache_lookup(False, duration * misses, misses)
+        return found
+
+    def _local_many(self, keys, version):
+        """Делит keys на свежие копии, устаревшие копии и отсутствующие."""
+        found, stale, missing = {}, {}, []
+        now, clock = time.time(), time.monotonic()
+        for key in keys:
+            local_key = self.make_key(key, version)
+            with self._lock:
+                entry = self._local.get(local_key)
+            if entry is None or not self._is_local(key):
+                missing.append(key)
+            elif entry[3] is not None and now >= entry[3]:
+                self._forget(local_key)
+                missing.append(key)
+            elif clock < entry[2]:
+                found[key] = entry[0]
+            else:
+                stale[key] = entry
+        return found, stale, missing
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        stamp, expires_at, value = envelope = self._envelope(value, timeout)
+        self.shared.set_many(
+            {key: envelope, self._version_key(key): stamp},
+            self._shared_timeout(timeout), version=version,
+        )
+        if self._is_local(key):
+            self._remember(
+                self.make_key(key, version), stamp, expires_at, value
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        stamp, expires_at, value = envelope = self._envelope(value, timeout)
+        shared_timeout = self._shared_timeout(timeout)
+        if not self.shared.add(key, envelope, shared_timeout, version):
+            return False
+        self.shared.set(
+            self._version_key(key), stamp, shared_timeout, version
+        )
+        if self._is_local(key):
+            self._remember(
+                self.make_key(key, version), stamp, expires_at, value
+            )
+        return True
+
+    def incr(self, key, delta=1, version=None):
+        lock_key = f'{key}:incr-lock'
+        while not self.shared.add(
+            lock_key, 1, self.INCR_LOCK_TIMEOUT, version=version
+        ):
+            time.sleep(self.INCR_LOCK_POLL)
+        try:
+            envelope = self.shared.get(key, version=version)
+            if envelope is None:
+                raise ValueError(f"Key '{key}' not found")
+            stamp, expires_at, value = envelope
+            value += delta
+            timeout = None
+            if expires_at is not None:
+                timeout = max(expires_at - time.time(), 0)
+            self.set(key, value, timeout, version)
+        finally:
+            self.shared.delete(lock_key, version=version)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        envelope = self.shared.get(key, version=version)
+        if envelope is None:
+            return False
+        self.set(key, envelope[2], timeout, version)
+        return True
+
+    def delete(self, key, version=None):
+        self.shared.delete_many(
+            [key, self._version_key(key)], version=version
+        )
+        self._forget(self.make_key(key, version))
+
+    def clear(self):
+        self.shared.clear()
+        with self._lock:
+            self._local.clear()
+
+    def _shared_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            return self.default_timeout
+        return timeout
+
+
+class AtomicFileBasedCache(FileBasedCache):
+    """Файловый кэш, в котором add() атомарен между потоками и процессами.
+
+    Стандартный add() — это has_key() и set(), и два процесса могут оба
+    «взять» одну блокировку. Здесь готовый файл жёстко связывается с
+    именем ключа: os.link не перезаписывает существующий файл, поэтому
+    выигрывает ровно один, а читатели не видят недописанного файла.
+    """
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            while True:
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    pass
+                try:
+                    # has_key удаляет просроченный файл; тогда пробуем снова.
+                    if self.has_key(key, version):
+                        return False
+                except FileNotFoundError:
+                    pass
+        finally:
+            os.remove(tmp_path)
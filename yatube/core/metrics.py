@@ -0,0 +1,335 @@
+"""Метрики процесса и их выдача в текстовом формате Prometheus.
+
+Счётчики и гистограммы копятся в памяти процесса и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сбрасываются в файл
+METRICS_DIR/<pid>-<время старта>.json. Страница метрик складывает файлы
+всех процессов (воркеров gunicorn и run_workers), поэтому данные других
+процессов видны с задержкой до METRICS_FLUSH_INTERVAL. Значения
+накопительные: файлы завершившихся процессов вливаются в aggregate.json,
+так что каталог не растёт с каждым перезапуском воркеров. Процессы
+должны жить на одной машине: живость проверяется по pid.
+
+Gauge не хранится, а считается функцией в момент запроса метрик.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.files import locks
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+AGGREGATE = 'aggregate.json'
+# Ключ aggregate.json: файлы, уже влитые в него. Если процесс упал между
+# записью aggregate.json и удалением этих файлов, они не учтутся дважды.
+FOLDED = '_folded'
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        self._check_fork()
+        self._flushed_at = time.monotonic()
+        self._dirty = False
+
+    def _check_fork(self):
+        """После fork заводит свой файл; значения родителя уже в его файле.
+
+        Вызывается под self._lock. pid повторяется после перезапуска,
+        поэтому в имени файла есть и время старта.
+        """
+        if os.getpid() == self._pid:
+            return
+        if self._pid is not None:
+            for stored in self.metrics.values():
+                stored.values.clear()
+            self._dirty = False
+        self._pid = os.getpid()
+        self._filename = f'{self._pid}-{time.time_ns()}.json'
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Метрика {metric.name} уже есть')
+        self.metrics[metric.name] = metric
+        return metric
+
+    def update(self, metric, labels, change):
+        """Меняет значение метрики под общей блокировкой реестра."""
+        with self._lock:
+            self._check_fork()
+            metric.values[labels] = change(metric.values.get(labels))
+            self._dirty = True
+        if time.monotonic() - self._flushed_at >= (
+            settings.METRICS_FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            self._dirty = False
+            return {
+                name: _samples(metric.values)
+                for name, metric in self.metrics.items()
+                if not isinstance(metric, Gauge)
+            }, self._filename
+
+    def flush(self):
+        """Записывает значения процесса атомарно: tmp-файл и os.replace."""
+        self._flushed_at = time.monotonic()
+        if not self._dirty:
+            return
+        directory = settings.METRICS_DIR
+        os.makedirs(directory, exist_ok=True)
+        with self._flush_lock:
+            data, filename = self.snapshot()
+            _write(os.path.join(directory, filename), data)
+
+    def merge(self, merged, data):
+        """Добавляет data из файла к {имя: {labels: значение}}."""
+        for name, samples in data.items():
+            metric = self.metrics.get(name)
+            if metric is None or isinstance(metric, Gauge):
+                continue
+            values = merged.setdefault(name, {})
+            for labels, value in samples:
+                labels = tuple(labels)
+                values[labels] = metric.merge(values.get(labels), value)
+
+    def collect(self):
+        """Сумма значений всех процессов: {имя: {labels: значение}}."""
+        self.flush()
+        merged = {name: {} for name in self.metrics}
+        directory = settings.METRICS_DIR
+        if not os.path.isdir(directory):
+            return merged
+        with open(os.path.join(directory, 'aggregate.lock'), 'a') as lock:
+            locks.lock(lock, locks.LOCK_EX)
+            try:
+                files = self.fold(directory)
+            finally:
+                locks.unlock(lock)
+        for data in files:
+            self.merge(merged, data)
+        return merged
+
+    def fold(self, directory):
+        """Вливает файлы завершившихся процессов в aggregate.json.
+
+        Вызывается под блокировкой aggregate.lock; возвращает содержимое
+        всех оставшихся файлов, включая aggregate.json.
+        """
+        aggregate_path = os.path.join(directory, AGGREGATE)
+        aggregate = _read(aggregate_path) or {}
+        folded = set(aggregate.get(FOLDED, ()))
+        live, dead = [], []
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == AGGREGATE:
+                continue
+            path = os.path.join(directory, filename)
+            if filename in folded:
+                _remove(path)
+                continue
+            data = _read(path)
+            if data is None:
+                continue
+            if filename == self._filename or _alive(filename):
+                live.append(data)
+            else:
+                dead.append((filename, data))
+        if dead:
+            totals = {}
+            for data in [aggregate, *(data for _, data in dead)]:
+                self.merge(totals, data)
+            aggregate = {
+                name: _samples(values) for name, values in totals.items()
+            }
+            aggregate[FOLDED] = [filename for filename, _ in dead]
+            _write(aggregate_path, aggregate)
+            for filename, _ in dead:
+                _remove(os.path.join(directory, filename))
+        return [aggregate, *live]
+
+    def exposition(self):
+        """Все метрики в текстовом формате Prometheus."""
+        merged = self.collect()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            values = (
+                metric.read() if isinstance(metric, Gauge) else merged[name]
+            )
+            for labels, value in sorted(values.items()):
+                lines.extend(metric.samples(dict(zip(metric.labels, labels)),
+                                            value))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+
+def _samples(values):
+    """{labels: значение} → список [[labels], значение] для JSON."""
+    return [
+        [list(labels), list(value) if isinstance(value, list) else value]
+        for labels, value in values.items()
+    ]
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def _write(path, data):
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _alive(filename):
+    """Жив ли процесс, записавший файл <pid>-<время старта>.json."""
+    if os.name == 'nt':
+        # os.kill(pid, 0) в Windows завершает процесс, а не проверяет его.
+        return True
+    try:
+        os.kill(int(filename.split('-')[0].split('.')[0]), 0)
+    except ValueError:
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _sample(name, labels, value):
+    if labels:
+        pairs = ','.join(
+            f'{key}="{_escape(label)}"' for key, label in labels.items()
+        )
+        name = f'{name}{{{pairs}}}'
+    return f'{name} {value}'
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.values = {}
+        self.registry = registry
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def merge(self, left, right):
+        return right if left is None else left + right
+
+    def samples(self, labels, value):
+        return [_sample(self.name, labels, value)]
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self.registry.update(
+            self, self._key(labels), lambda value: (value or 0) + amount
+        )
+
+
+class Histogram(Metric):
+    """Гистограмма с постоянными границами корзин.
+
+    Значение хранится как [число в каждой корзине..., сумма, количество];
+    корзина +Inf равна количеству.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS,
+                 registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels, registry)
+
+    def observe(self, amount, **labels):
+        index = bisect_left(self.buckets, amount)
+
+        def change(value):
+            value = value or [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                value[index] += 1
+            value[-2] += amount
+            value[-1] += 1
+            return value
+        self.registry.update(self, self._key(labels), change)
+
+    def merge(self, left, right):
+        if left is None:
+            return list(right)
+        return [a + b for a, b in zip(left, right)]
+
+    def samples(self, labels, value):
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            lines.append(_sample(
+                f'{self.name}_bucket', {**labels, 'le': f'{bound:g}'},
+                cumulative,
+            ))
+        lines.append(_sample(
+            f'{self.name}_bucket', {**labels, 'le': '+Inf'}, value[-1]
+        ))
+        lines.append(_sample(f'{self.name}_sum', labels, float(value[-2])))
+        lines.append(_sample(f'{self.name}_count', labels, value[-1]))
+        return lines
+
+
+class Gauge(Metric):
+    """Значение, которое function считает в момент запроса метрик.
+
+    function возвращает {кортеж меток: значение} или число, если меток
+    нет. Так в метрики попадают данные, общие для всех процессов уже
+    сейчас (например, из кэша), без сложения по процессам.
+    """
+    type = 'gauge'
+
+    def __init__(self, name, help, function, labels=(), registry=REGISTRY):
+        self.function = function
+        super().__init__(name, help, labels, registry)
+
+    def read(self):
+        values = self.function()
+        if not isinstance(values, dict):
+            return {(): values}
+        return values
@@ -0,0 +1,164 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import timing
+from .metrics import COUNT_BUCKETS, Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = Counter(
+    'yatube_requests_total', 'Ответы view по кодам статуса.',
+    labels=('view', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'yatube_request_duration_seconds', 'Время ответа view.',
+    labels=('view',),
+)
+REQUEST_QUERIES = Histogram(
+    'yatube_request_queries', 'Число SQL-запросов на ответ view.',
+    labels=('view',), buckets=COUNT_BUCKETS,
+)
+
+
+class ServerTimingMiddleware:
+    """Замер запроса: SQL, шаблоны, кэш и общее время.
+
+    Итог пишется строкой JSON в лог core.middleware с именем view, а
+    INTERNAL_IPS и персоналу ещё и в заголовок Server-Timing (его
+    показывает вкладка Network в DevTools): посторонним незачем видеть
+    устройство сайта. Замеряется доля SERVER_TIMING_SAMPLE_RATE запросов;
+    при SERVER_TIMING_ENABLED = False middleware не подключается вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.SERVER_TIMING_SAMPLE_RATE:
+            return self.get_response(request)
+        with ExitStack() as stack:
+            timings = measuring(stack)
+            start = time.perf_counter()
+            response = self.get_response(request)
+            timings.add('total', (time.perf_counter() - start) * 1000)
+        if internal(request):
+            header = server_timing(timings)
+            if response.has_header('Server-Timing'):
+                header = f'{response["Server-Timing"]}, {header}'
+            response['Server-Timing'] = header
+        logger.info(json.dumps(
+            log_record(request, response, timings), ensure_ascii=False
+        ))
+        return response
+
+
+class MetricsMiddleware:
+    """Время и число SQL-запросов каждого view из METRICS_NAMESPACES.
+
+    Пишет гистограммы в core.metrics; страница метрик — core.views.metrics.
+    Ставится после ServerTimingMiddleware, чтобы замер выбранных запросов
+    шёл в один сборщик.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            timings = measuring(stack)
+            queries = timings.counts.get('db', 0)
+            start = time.perf_counter()
+            response = self.get_response(request)
+            duration = time.perf_counter() - start
+            queries = timings.counts.get('db', 0) - queries
+        match = request.resolver_match
+        if match is not None and (
+            match.namespace in settings.METRICS_NAMESPACES
+        ):
+            view = match.view_name
+            REQUESTS.inc(view=view, status=response.status_code)
+            REQUEST_DURATION.observe(duration, view=view)
+            REQUEST_QUERIES.observe(queries, view=view)
+        return response
+
+
+def client_ip(request):
+    """Адрес клиента; за прокси из TRUSTED_PROXIES — из X-Forwarded-For.
+
+    Последний адрес в заголовке дописал сам прокси, прежние мог прислать
+    клиент. Запрос с адреса прокси без заголовка адреса клиента не имеет.
+    """
+    address = request.META.get('REMOTE_ADDR')
+    if address not in settings.TRUSTED_PROXIES:
+        return address
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    return forwarded.split(',')[-1].strip() or None
+
+
+def internal(request):
+    """Запрос от персонала или с адреса клиента из INTERNAL_IPS."""
+    if client_ip(request) in settings.INTERNAL_IPS:
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_staff
+
+
+def measuring(stack):
+    """Сборщик текущего запроса; заводит его, если замера ещё нет."""
+    timings = timing.current()
+    if timings is not None:
+        return timings
+    timings = stack.enter_context(timing.collecting())
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timing.query_wrapper))
+    return timings
+
+
+def server_timing(timings):
+    """Значение заголовка: db;dur=3.2;desc="4 queries", total;dur=9.5."""
+    durations, counts = timings.durations, timings.counts
+    metrics = []
+    if 'db' in counts:
+        metrics.append(
+            f'db;dur={durations["db"]:.1f};desc="{counts["db"]} queries"'
+        )
+    if 'template' in durations:
+        metrics.append(f'template;dur={durations["template"]:.1f}')
+    hits = counts.get('cache_hit', 0)
+    misses = counts.get('cache_miss', 0)
+    if hits or misses:
+        duration = (
+            durations.get('cache_hit', 0.0) + durations.get('cache_miss', 0.0)
+        )
+        metrics.append(
+            f'cache;dur={duration:.1f};desc="{hits} hits, {misses} misses"'
+        )
+    metrics.append(f'total;dur={durations["total"]:.1f}')
+    return ', '.join(metrics)
+
+
+def log_record(request, response, timings):
+    durations, counts = timings.durations, timings.counts
+    match = request.resolver_match
+    return {
+        'view': match.view_name if match is not None else None,
+        'method': request.method,
+        'status': response.status_code,
+        'total_ms': round(durations['total'], 1),
+        'db_ms': round(durations.get('db', 0.0), 1),
+        'db_queries': counts.get('db', 0),
+        'template_ms': round(durations.get('template', 0.0), 1),
+        'cache_hits': counts.get('cache_hit', 0),
+        'cache_misses': counts.get('cache_miss', 0),
+    }
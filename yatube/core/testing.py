@@ -0,0 +1,68 @@
+import copy
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .metrics import REGISTRY
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(limit, using=DEFAULT_DB_ALIAS):
+    """Падает, если внутри блока выполнено больше limit SQL-запросов."""
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    executed = len(context.captured_queries)
+    if executed > limit:
+        queries = '\n'.join(
+            f'{num}. {query["sql"]}'
+            for num, query in enumerate(context.captured_queries, start=1)
+        )
+        raise QueryBudgetExceeded(
+            f'Выполнено {executed} запросов при бюджете {limit}:\n{queries}'
+        )
+
+
+def test_settings(directory):
+    """Настройки на время тестов; directory — временный каталог.
+
+    Замер Server-Timing не засоряет вывод строками лога (тесты замера
+    включают его сами), а метрики и файловые кэши тестов не попадают в
+    каталоги настоящего сайта: иначе сайт отдал бы фрагменты лент из
+    тестов, а cache.clear() в тесте стёр бы его кэш.
+    """
+    caches = copy.deepcopy(settings.CACHES)
+    for alias, options in caches.items():
+        if options['BACKEND'].endswith('FileBasedCache'):
+            options['LOCATION'] = os.path.join(directory, 'cache', alias)
+    return {
+        'SERVER_TIMING_SAMPLE_RATE': 0,
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+        'CACHES': caches,
+    }
+
+
+class TestRunner(DiscoverRunner):
+    """manage.py test с настройками test_settings()."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.directory = tempfile.mkdtemp()
+        self.overridden = override_settings(**test_settings(self.directory))
+        self.overridden.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        # Иначе atexit сбросит метрики тестов в настоящий METRICS_DIR.
+        REGISTRY.flush()
+        self.overridden.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,4 +1,34 @@
-from django.test import Client, TestCase
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+
+from django.urls import reverse
+
+from core import metrics, timing
+from core.cache_backends import AtomicFileBasedCache, TwoTierCache
+from core.template_backends import TimedDjangoTemplates
+from core.views import serve_media
+
+SHARED_LOCMEM = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-tests',
+    },
+}
 
 
 class CorePagesURLTests(TestCase):
@@ -14,3 +44,304 @@ class CorePagesURLTests(TestCase):
         """Страница 403 использует неверный шаблон"""
         response = self.guest_client.get('')
         self.assertTemplateUsed(response, 'core/403csrf.html')
+
+
+@override_settings(CACHES=SHARED_LOCMEM)
+class TwoTierCacheTests(SimpleTestCase):
+    def make_cache(self, **options):
+        options.setdefault('LOCAL_TIMEOUT', 60)
+        return TwoTierCache('shared', {'OPTIONS': options})
+
+    def setUp(self):
+        self.worker = self.make_cache()
+        self.neighbour = self.make_cache(LOCAL_TIMEOUT=0)
+        self.worker.clear()
+
+    def test_local_hit_does_not_touch_shared_cache(self):
+        """Свежая локальная копия отдаётся без общего кэша"""
+        self.worker.set('feed', 'страница')
+        self.worker.shared.clear()
+        self.assertEqual(self.worker.get('feed'), 'страница')
+
+    def test_changes_are_visible_to_other_processes(self):
+        """Запись и удаление в одном процессе видны в другом"""
+        self.neighbour.set('feed', 'старая')
+        self.assertEqual(self.neighbour.get('feed'), 'старая')
+        self.worker.set('feed', 'новая')
+        self.assertEqual(self.neighbour.get('feed'), 'новая')
+        self.worker.delete('feed')
+        self.assertIsNone(self.neighbour.get('feed'))
+
+    def test_local_tier_is_bounded_lru(self):
+        """Локальный уровень держит не больше MAX_ENTRIES ключей"""
+        cache = self.make_cache(MAX_ENTRIES=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+        self.assertEqual(len(cache._local), 2)
+        self.assertEqual(cache.get('a'), 'a')
+
+    def test_timeout_and_incr(self):
+        """Срок жизни соблюдается, incr работает поверх конверта"""
+        self.worker.set('short', 1, timeout=0.05)
+        self.worker.set('counter', 1)
+        self.assertEqual(self.worker.incr('counter', 2), 3)
+        self.assertEqual(self.neighbour.get('counter'), 3)
+        time.sleep(0.1)
+        self.assertIsNone(self.worker.get('short'))
+
+    def test_concurrent_incr_loses_nothing(self):
+        """Одновременные incr из разных процессов не теряют сдвигов"""
+        self.worker.set('counter', 0)
+        caches = [self.make_cache() for _ in range(4)]
+
+        def bump(cache):
+            for _ in range(25):
+                cache.incr('counter')
+        threads = [
+            threading.Thread(target=bump, args=(cache,)) for cache in caches
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.neighbour.get('counter'), 100)
+
+    def test_get_many_batches_shared_reads(self):
+        """get_many отдаёт свежие копии, остальное читает пачкой"""
+        self.worker.set('a', 1)
+        self.neighbour.set('b', 2)
+        self.neighbour.set('c', 3)
+        self.worker.set('c', 4)
+        shared = self.neighbour.shared
+        with mock.patch.object(
+            shared, 'get_many', wraps=shared.get_many
+        ) as get_many:
+            values = self.neighbour.get_many(['a', 'b', 'c', 'missing'])
+        self.assertEqual(values, {'a': 1, 'b': 2, 'c': 4})
+        self.assertEqual(get_many.call_count, 2)
+        shared.clear()
+        self.assertEqual(self.worker.get_many(['a', 'c']), {'a': 1, 'c': 4})
+
+    def test_shared_only_keys_skip_local_tier(self):
+        """Ключи SHARED_ONLY всегда читаются из общего кэша"""
+        cache = self.make_cache(SHARED_ONLY=['generation:'])
+        cache.set('generation:index', 1)
+        self.assertEqual(cache.get('generation:index'), 1)
+        self.worker.incr('generation:index')
+        self.assertEqual(cache.get('generation:index'), 2)
+        self.assertEqual(len(cache._local), 0)
+
+
+class AtomicFileBasedCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = AtomicFileBasedCache(self.directory, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_add_respects_existing_and_expired_keys(self):
+        """add() не трогает живой ключ и занимает просроченный"""
+        self.assertTrue(self.cache.add('lock', 1, timeout=0.05))
+        self.assertFalse(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.get('lock'), 1)
+        time.sleep(0.1)
+        self.assertTrue(self.cache.add('lock', 3))
+        self.assertEqual(self.cache.get('lock'), 3)
+
+    def test_concurrent_add_has_one_winner(self):
+        """Из одновременных add() выигрывает ровно один"""
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.cache.add('lock', True))
+            )
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+
+
+class ServeMediaTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.hashed = f'posts/ab/cd/ab{"0" * 62}.gif'
+        for name in (self.hashed, 'posts/old.gif'):
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as media:
+                media.write(b'GIF89a')
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def serve(self, name):
+        request = RequestFactory().get(f'/media/{name}')
+        return serve_media(request, name, document_root=self.root)
+
+    def test_content_addressed_media_is_immutable(self):
+        """Файлы по содержимому кэшируются навсегда, остальные — нет"""
+        cache_control = self.serve(self.hashed)['Cache-Control']
+        self.assertIn('immutable', cache_control)
+        self.assertIn('max-age=31536000', cache_control)
+        response = self.serve('posts/old.gif')
+        self.assertFalse(response.has_header('Cache-Control'))
+
+
+@override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_header_and_log_line(self):
+        """Запрос получает Server-Timing и строку в логе с именем view"""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(header, r'template;dur=[\d.]+')
+        self.assertRegex(header, r'cache;dur=[\d.]+;desc="\d+ hits, \d+ mis')
+        self.assertRegex(header, r'total;dur=[\d.]+$')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['db_queries'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+    def test_header_only_for_internal_requests(self):
+        """Посторонним заголовок не отдаётся, но замер попадает в лог"""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            response = self.client.get(
+                reverse('posts:index'), REMOTE_ADDR='10.0.0.1'
+            )
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(len(logs.records), 1)
+        staff = get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        )
+        self.client.force_login(staff)
+        response = self.client.get(
+            reverse('posts:index'), REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    def test_engine_keeps_django_alias(self):
+        """Замеряющий движок шаблонов доступен как engines['django']"""
+        self.assertIsInstance(engines['django'], TimedDjangoTemplates)
+
+    def test_nested_templates_counted_once(self):
+        """Вложенная отрисовка шаблона не прибавляет время дважды"""
+        with timing.collecting() as timings:
+            with timing.measure('template'):
+                with timing.measure('template'):
+                    pass
+        self.assertEqual(timings.counts['template'], 1)
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_is_not_measured(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled_middleware_is_not_loaded(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        overridden = override_settings(METRICS_DIR=self.directory)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        self.registry = metrics.Registry()
+
+    def test_processes_are_summed(self):
+        """Значения из файлов других процессов складываются со своими"""
+        counter = metrics.Counter(
+            'hits_total', 'Hits.', labels=('view',), registry=self.registry
+        )
+        histogram = metrics.Histogram(
+            'latency_seconds', 'Latency.', buckets=(0.1, 1),
+            registry=self.registry,
+        )
+        counter.inc(view='a')
+        histogram.observe(0.05)
+        histogram.observe(5)
+        other = {
+            'hits_total': [[['a'], 2], [['b'], 1]],
+            'latency_seconds': [[[], [0, 1, 0.5, 1]]],
+        }
+        with open(os.path.join(self.directory, '1.json'), 'w') as file:
+            json.dump(other, file)
+        lines = self.registry.exposition().splitlines()
+        self.assertIn('hits_total{view="a"} 3', lines)
+        self.assertIn('hits_total{view="b"} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{le="1"} 2', lines)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn('latency_seconds_sum 5.55', lines)
+        self.assertIn('latency_seconds_count 3', lines)
+
+    def test_dead_processes_are_folded(self):
+        """Файлы завершившихся процессов вливаются в aggregate.json"""
+        counter = metrics.Counter(
+            'hits_total', 'Hits.', registry=self.registry
+        )
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        dead = f'{process.pid}-1.json'
+        for filename in (dead, 'aggregate.json'):
+            with open(os.path.join(self.directory, filename), 'w') as file:
+                json.dump({'hits_total': [[[], 2]]}, file)
+        counter.inc()
+        for _ in range(2):
+            self.assertIn('hits_total 5', self.registry.exposition())
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            [self.registry._filename, 'aggregate.json', 'aggregate.lock'],
+        )
+        # Упавший сбор не успел удалить влитый файл: он не считается снова.
+        with open(os.path.join(self.directory, dead), 'w') as file:
+            json.dump({'hits_total': [[[], 2]]}, file)
+        self.assertIn('hits_total 5', self.registry.exposition())
+        self.assertNotIn(dead, os.listdir(self.directory))
+
+    def test_endpoint_records_views(self):
+        """Страница метрик видит запросы к view и закрыта для чужих"""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"}', body
+        )
+        self.assertIn('yatube_feed_cache_hit_ratio{kind="index"}', body)
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_endpoint_behind_proxy(self):
+        """За прокси доступ решает адрес из X-Forwarded-For, а не прокси"""
+        url = reverse('metrics')
+        for forwarded, status in (
+            (None, 404),
+            ('10.0.0.1', 404),
+            ('127.0.0.1, 10.0.0.1', 404),
+            ('10.0.0.1, 127.0.0.1', 200),
+        ):
+            with self.subTest(forwarded=forwarded):
+                headers = {}
+                if forwarded is not None:
+                    headers['HTTP_X_FORWARDED_FOR'] = forwarded
+                response = self.client.get(url, **headers)
+                self.assertEqual(response.status_code, status)
+        staff = get_user_model().objects.create_user(
+            username='staff', is_staff=True
+        )
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
@@ -0,0 +1,76 @@
+"""Счётчики времени текущего запроса для заголовка Server-Timing.
+
+Пока запрос не выбран для замера (см. core.middleware), активного
+сборщика нет, и measure() с cache_lookup() сводятся к одной проверке
+contextvar.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('request_timings', default=None)
+
+
+class Timings:
+    """Время (мс) и счётчики по видам работы за один запрос."""
+
+    def __init__(self):
+        self.durations = {}
+        self.counts = {}
+        self._active = set()
+
+    def add(self, name, duration=0.0, count=1):
+        self.durations[name] = self.durations.get(name, 0.0) + duration
+        self.counts[name] = self.counts.get(name, 0) + count
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def collecting():
+    """Включает сбор для кода внутри блока и отдаёт сборщик."""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def measure(name):
+    """Засекает время блока; вложенные блоки того же name не считаются.
+
+    Так шаблон, отрисованный внутри другого шаблона, не учтётся дважды.
+    """
+    timings = _current.get()
+    if timings is None or name in timings._active:
+        yield
+        return
+    timings._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._active.discard(name)
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def cache_lookup(hit, duration, count=1):
+    timings = _current.get()
+    if timings is not None:
+        timings.add('cache_hit' if hit else 'cache_miss', duration, count)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обёртка для connection.execute_wrapper: время и число запросов."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', (time.perf_counter() - start) * 1000)
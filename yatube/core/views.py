@@ -1,4 +1,15 @@
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+from posts.storage import is_content_addressed
+
+from .metrics import REGISTRY
+from .middleware import internal
+
+# Файлы по содержимому не меняются, их можно кэшировать навсегда.
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def page_not_found(request, exception):
@@ -11,3 +22,27 @@ def csrf_failure(request, reason=''):
 
 def internal_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve с вечным кэшем для файлов по содержимому.
+
+    Работает только при DEBUG; настройка веб-сервера для продакшена — в
+    README, раздел «Медиафайлы в продакшене».
+    """
+    response = serve(request, path, document_root, show_indexes)
+    if response.status_code == 200 and is_content_addressed(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    return response
+
+
+def metrics(request):
+    """Метрики всех процессов для Prometheus; чужим адресам — 404."""
+    if not internal(request):
+        raise Http404
+    return HttpResponse(
+        REGISTRY.exposition(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
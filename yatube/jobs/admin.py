@@ -0,0 +1,23 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'priority', 'attempts', 'run_at', 'finished'
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('=key',)
+    readonly_fields = ('created', 'finished', 'last_error')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        retried = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED, attempts=0, run_at=timezone.now(),
+            locked_until=None, finished=None,
+        )
+        self.message_user(request, f'Снова в очереди: {retried}')
+    retry.short_description = 'Повторить неудавшиеся задачи'
@@ -0,0 +1,86 @@
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from jobs import queue
+
+
+def _process_main(burst):
+    import django
+    django.setup()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    queue.work(stop, burst)
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOBS_WORKERS,
+            help='Сколько задач выполнять одновременно',
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Воркеры — процессы, а не потоки: для задач, которые '
+                 'упираются в процессор',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда в очереди не останется готовых задач',
+        )
+
+    def handle(self, *args, **options):
+        workers, burst = options['workers'], options['burst']
+        if workers < 1:
+            raise CommandError('--workers должен быть положительным')
+        kind = 'процессов' if options['processes'] else 'потоков'
+        self.stdout.write(f'Воркеров: {workers} {kind}')
+        if options['processes']:
+            self.run_processes(workers, burst)
+        else:
+            self.run_threads(workers, burst)
+        self.stdout.write(self.style.SUCCESS('Воркеры остановлены'))
+
+    def run_threads(self, workers, burst):
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        signal.signal(signal.SIGINT, lambda *args: stop.set())
+        threads = [
+            threading.Thread(
+                target=queue.work, args=(stop, burst),
+                name=f'jobs-{number}',
+            )
+            for number in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            # join с таймаутом, чтобы главный поток успевал ловить сигналы.
+            while thread.is_alive():
+                thread.join(timeout=1)
+
+    def run_processes(self, workers, burst):
+        # Открытое соединение нельзя делить с дочерними процессами.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(
+                target=_process_main, args=(burst,), name=f'jobs-{number}'
+            )
+            for number in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        def terminate(*args):
+            for process in processes:
+                process.terminate()
+        signal.signal(signal.SIGTERM, terminate)
+        for process in processes:
+            process.join()
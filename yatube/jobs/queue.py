@@ -0,0 +1,152 @@
+"""Очередь задач в таблице Job: постановка, захват воркером, выполнение.
+
+Воркер забирает задачу условным UPDATE (status и locked_until должны
+остаться теми, что он прочитал), поэтому двум воркерам одна задача не
+достанется ни в SQLite, ни в PostgreSQL. Захват — это аренда на
+JOBS_LEASE секунд: задачу упавшего воркера после неё возьмёт другой.
+Неудачная попытка откладывает задачу с экспоненциальной паузой, после
+max_attempts попыток задача помечается FAILED.
+"""
+import json
+import logging
+import random
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Столько первых задач пробует захватить воркер, если их уже разбирают.
+CLAIM_CANDIDATES: int = 10
+PURGE_INTERVAL: int = 60
+
+
+def enqueue(task, args=(), kwargs=None, key=None, priority=0, delay=0):
+    """Ставит задачу; с JOBS_EAGER выполняет её сразу и возвращает None."""
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+    if settings.JOBS_EAGER:
+        data = json.loads(payload)
+        task.func(*data['args'], **data['kwargs'])
+        return None
+    fields = {
+        'name': task.name,
+        'payload': payload,
+        'priority': priority,
+        'max_attempts': task.max_attempts,
+        'run_at': timezone.now() + timedelta(seconds=delay),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    job, created = Job.objects.get_or_create(key=key, defaults=fields)
+    if not created and job.status == Job.FAILED:
+        # Упавшая задача остаётся для разбора, но не должна навсегда
+        # глотать новые постановки с тем же ключом: ставим её заново.
+        Job.objects.filter(pk=job.pk, status=Job.FAILED).update(
+            **fields, status=Job.QUEUED, attempts=0, finished=None,
+        )
+        job.refresh_from_db()
+    return job
+
+
+def backoff(attempts):
+    """Пауза перед следующей попыткой: растёт вдвое, с разбросом до 25%."""
+    delay = min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_MAX_DELAY,
+    )
+    return delay * random.uniform(1, 1.25)
+
+
+def claim():
+    """Забирает самую приоритетную готовую задачу или возвращает None."""
+    now = timezone.now()
+    candidates = Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now)
+    ).order_by('-priority', 'run_at').values_list(
+        'pk', 'status', 'locked_until'
+    )[:CLAIM_CANDIDATES]
+    for pk, status, locked_until in candidates:
+        claimed = Job.objects.filter(
+            pk=pk, status=status, locked_until=locked_until
+        ).update(
+            status=Job.RUNNING,
+            locked_until=now + timedelta(seconds=settings.JOBS_LEASE),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Выполняет захваченную задачу и записывает результат попытки."""
+    task = REGISTRY.get(job.name)
+    try:
+        if task is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        if job.attempts > job.max_attempts:
+            raise RuntimeError('Попытки исчерпаны: воркер упал на задаче')
+        data = json.loads(job.payload)
+        task.func(*data['args'], **data['kwargs'])
+    except Exception:
+        logger.exception('Задача %s не выполнилась', job)
+        now = timezone.now()
+        result = {'last_error': traceback.format_exc(), 'locked_until': None}
+        if task is None or job.attempts >= job.max_attempts:
+            result.update(status=Job.FAILED, finished=now)
+        else:
+            result.update(
+                status=Job.QUEUED,
+                run_at=now + timedelta(seconds=backoff(job.attempts)),
+            )
+    else:
+        result = {
+            'status': Job.DONE, 'finished': timezone.now(),
+            'locked_until': None, 'last_error': '',
+        }
+    Job.objects.filter(pk=job.pk).update(**result)
+    close_old_connections()
+
+
+def purge():
+    """Удаляет выполненные задачи старше JOBS_KEEP_DONE секунд."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_KEEP_DONE)
+    return Job.objects.filter(
+        status=Job.DONE, finished__lt=cutoff
+    ).delete()[0]
+
+
+def work(stop, burst=False):
+    """Цикл воркера: до stop.set() или, с burst, до пустой очереди."""
+    purged_at = 0
+    try:
+        while not stop.is_set():
+            if time.monotonic() - purged_at > PURGE_INTERVAL:
+                purge()
+                purged_at = time.monotonic()
+            try:
+                job = claim()
+                if job is not None:
+                    execute(job)
+            except DatabaseError:
+                # Например, «database is locked» в SQLite под нагрузкой:
+                # воркер не умирает, а незаписанную задачу после аренды
+                # возьмут снова.
+                logger.exception('Ошибка базы в воркере очереди')
+                stop.wait(settings.JOBS_POLL_INTERVAL)
+                continue
+            if job is None:
+                if burst:
+                    return
+                stop.wait(settings.JOBS_POLL_INTERVAL)
+    finally:
+        close_old_connections()
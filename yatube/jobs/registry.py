@@ -0,0 +1,58 @@
+from django.conf import settings
+
+REGISTRY = {}
+
+
+class Task:
+    """Функция, которую можно вызвать сразу или отложить в очередь."""
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def defer(self, *args, key=None, priority=None, delay=0, **kwargs):
+        """Ставит вызов в очередь; аргументы должны укладываться в JSON.
+
+        key — ключ идемпотентности: пока задача с ним есть в очереди
+        (в том числе выполненная и ещё не вычищенная), вторая не ставится;
+        не удавшаяся задача с этим ключом ставится заново.
+        delay — через сколько секунд задачу можно брать.
+        """
+        from .queue import enqueue
+        return enqueue(
+            self, args, kwargs, key=key,
+            priority=self.priority if priority is None else priority,
+            delay=delay,
+        )
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+
+def task(func=None, *, name=None, priority=0, max_attempts=None):
+    """Регистрирует функцию как задачу.
+
+        @task(priority=10)
+        def send_mail(subject, body, to):
+            ...
+
+        send_mail.defer('Тема', 'Текст', ['user@example.com'])
+
+    Модули tasks.py приложений импортируются при старте (JobsConfig), так
+    что воркер находит задачи по имени «модуль.функция».
+    """
+    def register(func):
+        registered = Task(
+            func,
+            name or f'{func.__module__}.{func.__name__}',
+            priority,
+            max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        )
+        REGISTRY[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
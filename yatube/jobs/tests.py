@@ -0,0 +1,185 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from jobs import queue
+from jobs.models import Job
+from jobs.registry import task
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.tests.test_thumbnails import SMALL_GIF
+
+calls = []
+
+
+@task(name='jobs.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.tests.flaky', max_attempts=2)
+def flaky():
+    raise ValueError('не вышло')
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_all(self):
+        while True:
+            job = queue.claim()
+            if job is None:
+                return
+            queue.execute(job)
+
+    def test_defer_and_execute(self):
+        """Задача ждёт воркера, а затем выполняется с аргументами"""
+        job = record.defer('раз')
+        self.assertEqual(calls, [])
+        self.run_all()
+        job.refresh_from_db()
+        self.assertEqual(calls, ['раз'])
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+    def test_priority_and_delay(self):
+        """Приоритетные задачи раньше, отложенные — не раньше срока"""
+        record.defer('обычная')
+        record.defer('срочная', priority=5)
+        record.defer('потом', delay=60)
+        self.run_all()
+        self.assertEqual(calls, ['срочная', 'обычная'])
+
+    def test_idempotency_key(self):
+        """Вторая задача с тем же ключом не ставится"""
+        first = record.defer('раз', key='once')
+        second = record.defer('два', key='once')
+        self.assertEqual(first.pk, second.pk)
+        self.run_all()
+        self.assertEqual(calls, ['раз'])
+
+    def test_retry_with_backoff(self):
+        """Ошибка откладывает задачу, после max_attempts она FAILED"""
+        job = flaky.defer()
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.execute(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('не вышло', job.last_error)
+        self.assertIsNone(queue.claim())
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.execute(queue.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_failed_key_is_requeued(self):
+        """Ключ не удавшейся задачи не блокирует новую постановку"""
+        job = flaky.defer(key='flaky')
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.FAILED, attempts=2, finished=timezone.now()
+        )
+        again = flaky.defer(key='flaky')
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual((again.status, again.attempts), (Job.QUEUED, 0))
+        self.assertEqual(queue.claim().pk, job.pk)
+
+    def test_expired_lease_is_reclaimed(self):
+        """Задачу упавшего воркера забирает другой после аренды"""
+        job = record.defer('снова')
+        self.assertIsNotNone(queue.claim())
+        self.assertIsNone(queue.claim())
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(queue.claim().pk, job.pk)
+
+    def test_purge(self):
+        """Старые выполненные задачи удаляются, ключ освобождается"""
+        job = record.defer('раз', key='purged')
+        self.run_all()
+        Job.objects.filter(pk=job.pk).update(
+            finished=timezone.now() - timedelta(days=2)
+        )
+        self.assertEqual(queue.purge(), 1)
+        self.assertNotEqual(record.defer('два', key='purged').pk, job.pk)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager(self):
+        """С JOBS_EAGER задача выполняется сразу, без записи в очередь"""
+        self.assertIsNone(record.defer('сразу'))
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Job.objects.exists())
+
+
+class RunWorkersTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_burst(self):
+        """run_workers --burst разбирает очередь и выходит"""
+        for value in range(3):
+            record.defer(value)
+        call_command(
+            'run_workers', '--workers=1', '--burst', stdout=StringIO()
+        )
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 3)
+
+
+class DeferredSideEffectsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_fan_out_is_deferred(self):
+        """Новый пост попадает в ленты подписчиков из воркера"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        entries = TimelineEntry.objects.filter(user=self.reader, post=post)
+        self.assertFalse(entries.exists())
+        queue.execute(queue.claim())
+        self.assertTrue(entries.exists())
+
+    def test_password_reset_mail_is_deferred(self):
+        """Письмо сброса пароля отправляет воркер, а не запрос"""
+        response = Client().post(
+            reverse('users:password_reset'), {'email': 'reader@example.com'}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        queue.execute(queue.claim())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['reader@example.com'])
+
+
+class ThumbnailJobTests(TestCase):
+    def test_images_are_queued_with_post(self):
+        """Обработка картинки ставится в очередь с ключом поста"""
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        client = Client()
+        client.force_login(User.objects.create_user(username='author'))
+        image = SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        with override_settings(MEDIA_ROOT=media):
+            client.post(
+                reverse('posts:post_create'),
+                {'text': 'С картинкой', 'image': image},
+            )
+        post = Post.objects.get()
+        job = Job.objects.get(name='posts.tasks.generate_images')
+        self.assertEqual(job.key, f'images:{post.pk}:{post.image.name}')
@@ -1,10 +1,73 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
-from .models import Group, Post
+from . import search
+from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Автодополнение, которому выбранный объект отдаёт форма.
+
+    Обычный виджет достаёт выбранное значение отдельным запросом, и в
+    list_editable это по запросу на каждую строку списка.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        if self.selected is None:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, self.selected.pk,
+            self.choices.field.label_from_instance(self.selected),
+            True, len(options),
+        ))
+        return [(None, options, 0)]
+
+
+class LoadedAutocompleteForm(forms.ModelForm):
+    """Форма строки списка: выбранные объекты берутся из select_related."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name, field in self.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, LoadedAutocompleteSelect):
+                widget.selected = getattr(self.instance, name, None)
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Общие настройки списков, которым не страшны миллионы строк.
+
+    Вместо COUNT(*) — оценка EstimatedCountPaginator, второй подсчёт
+    «всего без фильтров» выключен, связи подтягиваются JOIN-ом, а
+    внешние ключи выбираются автодополнением, а не <select> из всех строк.
+    Даты фильтруются list_filter с диапазонами по индексу: date_hierarchy
+    строит ссылки через SELECT DISTINCT по всей таблице.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request):
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', LoadedAutocompleteForm)
+        return super().get_changelist_form(request, **kwargs)
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableAdmin):
     list_display = (
         'pk',
         'text',
@@ -14,12 +77,37 @@ class PostAdmin(admin.ModelAdmin):
         'image',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск через индекс FTS5 вместо LIKE '%...%' по всей таблице.
+        if not search_term:
+            return queryset, False
+        return search.matching(queryset, search_term), False
 
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'description')
+    search_fields = ('title', 'slug')
     empty_value_display = '-пусто-'
+
+
+@admin.register(Comment)
+class CommentAdmin(ScalableAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    search_fields = ('=author__username',)
+    list_filter = ('created',)
+
+
+@admin.register(Follow)
+class FollowAdmin(ScalableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
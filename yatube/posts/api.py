@@ -0,0 +1,168 @@
+"""JSON-версии лент для мобильных клиентов.
+
+Строки собираются из кортежей values_list, без экземпляров моделей, и
+из базы читаются только поля, запрошенные в ?fields=. Листаются ленты
+курсором (?cursor=), как и HTML-версии. ETag общих лент, групп и
+профилей строится по поколению ленты из caching, поэтому повторный
+запрос с If-None-Match получает 304 без обращения к базе.
+"""
+import json
+from datetime import datetime
+from hashlib import md5
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from . import caching, timeline
+from .models import Group, Post, User
+from .paginators import CursorPaginator, MergedCursorPaginator
+
+PAGE_SIZE: int = 10
+
+
+def _image_url(name):
+    if not name:
+        return None
+    return Post._meta.get_field('image').storage.url(name)
+
+
+# Поле ответа: (колонка для values_list, преобразование значения или None).
+# Сюда попадает только то, что сдвигает поколение ленты при изменении,
+# иначе ETag отдал бы 304 на устаревшие данные: поля поста — через его
+# сохранение и posts.variants, author — через invalidate_renamed_user,
+# group — через invalidate_saved_group (см. posts.signals).
+FIELDS = {
+    'id': ('pk', None),
+    'text': ('text', None),
+    'pub_date': ('pub_date', datetime.isoformat),
+    'author': ('author__username', None),
+    'group': ('group__slug', None),
+    'image': ('image', _image_url),
+    'image_width': ('image_width', None),
+    'image_height': ('image_height', None),
+}
+# Без них не построить курсор следующей страницы.
+CURSOR_COLUMNS = ('pk', 'pub_date')
+
+
+def _json(data, status=200):
+    return HttpResponse(
+        json.dumps(data, ensure_ascii=False, separators=(',', ':')),
+        content_type='application/json', status=status,
+    )
+
+
+def _error(message, status):
+    return _json({'detail': message}, status=status)
+
+
+def requested_fields(request):
+    """Поля из ?fields=a,b в порядке FIELDS; ValueError для неизвестных."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(FIELDS)
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = names - FIELDS.keys()
+    if unknown:
+        raise ValueError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return [name for name in FIELDS if name in names]
+
+
+def columns(fields):
+    return list(dict.fromkeys(
+        [*CURSOR_COLUMNS, *(FIELDS[name][0] for name in fields)]
+    ))
+
+
+def serializer(fields):
+    """Функция, превращающая кортеж values_list в словарь ответа."""
+    positions = {column: index for index, column in
+                 enumerate(columns(fields))}
+    plan = [
+        (name, positions[FIELDS[name][0]], FIELDS[name][1])
+        for name in fields
+    ]
+
+    def serialize(row):
+        return {
+            name: row[index] if convert is None or row[index] is None
+            else convert(row[index])
+            for name, index, convert in plan
+        }
+    return serialize
+
+
+def feed_etag(scope, request):
+    """ETag ленты: поколение scope плюс курсор и набор полей."""
+    params = request.GET
+    raw = (
+        f'{scope}:{caching.generation(scope)}:'
+        f'{params.get("cursor", "")}|{params.get("fields", "")}'
+    )
+    return quote_etag(md5(raw.encode()).hexdigest())
+
+
+def feed(request, queryset, scope=None, sources=()):
+    """Ответ API для ленты queryset (и подмешанных sources).
+
+    Для ленты со scope ETag известен до запроса к базе; для остальных
+    он считается по готовому телу ответа.
+    """
+    try:
+        fields = requested_fields(request)
+    except ValueError as error:
+        return _error(str(error), 400)
+    etag = feed_etag(scope, request) if scope is not None else None
+    if etag is not None:
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+    selected = columns(fields)
+    rows = [
+        source.values_list(*selected, named=True)
+        for source in [queryset, *sources]
+    ]
+    if sources:
+        paginator = MergedCursorPaginator(rows, PAGE_SIZE)
+    else:
+        paginator = CursorPaginator(rows[0], PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('cursor'))
+    serialize = serializer(fields)
+    response = _json({
+        'results': [serialize(row) for row in page],
+        'next': page.next_cursor or None,
+        'previous': page.previous_cursor or None,
+    })
+    if etag is None:
+        etag = quote_etag(md5(response.content).hexdigest())
+    response['ETag'] = etag
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def index(request):
+    return feed(request, Post.objects.all(), 'index')
+
+
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).only('pk').first()
+    if group is None:
+        return _error('Группа не найдена', 404)
+    return feed(request, group.posts.all(), f'group:{group.pk}')
+
+
+def profile(request, username):
+    author = User.objects.filter(username=username).only('pk').first()
+    if author is None:
+        return _error('Автор не найден', 404)
+    return feed(request, author.posts.all(), f'profile:{author.pk}')
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error('Нужна авторизация', 401)
+    queryset = Post.objects.filter(timeline_entries__user=request.user)
+    sources = timeline.pulled_sources(request.user.pk)
+    response = feed(request, queryset, sources=sources)
+    response['Vary'] = 'Cookie'
+    return response
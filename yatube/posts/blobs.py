@@ -0,0 +1,63 @@
+"""Счётчики ссылок постов на файлы хранилища по содержимому.
+
+Одинаковые загрузки делят один файл, поэтому удалять его можно, только
+когда на него не ссылается ни один пост. Загрузка берёт ссылку (pin)
+до того, как сохранить или переиспользовать файл, а сборка удаляет
+строку MediaBlob и файл в одной транзакции. Так ссылка новой загрузки
+либо не даёт удалить файл, либо ждёт конца удаления и пишет файл заново.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import MediaBlob, Post
+from .storage import is_content_addressed
+
+_pins = threading.local()
+
+
+def retain(name):
+    """Ещё одна ссылка на файл картинки."""
+    if not is_content_addressed(name):
+        return
+    rows = MediaBlob.objects.filter(name=name)
+    if not rows.update(refcount=F('refcount') + 1):
+        MediaBlob.objects.get_or_create(name=name)
+        rows.update(refcount=F('refcount') + 1)
+
+
+def pin(name):
+    """Ссылка от только что сохранённого файла; её забирает claim()."""
+    retain(name)
+    pins = getattr(_pins, 'names', None)
+    if pins is None:
+        pins = _pins.names = []
+    pins.append(name)
+
+
+def claim(name):
+    """Забирает ссылку pin(), если файл сохранён в этом потоке."""
+    pins = getattr(_pins, 'names', [])
+    if name in pins:
+        pins.remove(name)
+        return True
+    return False
+
+
+def release(name):
+    """Минус ссылка; файл без ссылок удаляется после коммита."""
+    if not is_content_addressed(name):
+        return
+    MediaBlob.objects.filter(name=name, refcount__gte=1).update(
+        refcount=F('refcount') - 1
+    )
+    transaction.on_commit(lambda: collect(name))
+
+
+@transaction.atomic
+def collect(name):
+    # DELETE держит строку до коммита, и retain() новой загрузки того же
+    # файла ждёт его, а не переиспользует файл, который сейчас удалят.
+    if MediaBlob.objects.filter(name=name, refcount=0).delete()[0]:
+        Post._meta.get_field('image').storage.delete(name)
@@ -0,0 +1,218 @@
+import math
+import random
+import time
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.metrics import REGISTRY, Counter, Gauge
+
+from .models import Post
+from .paginators import CURSOR_LAST, decode_cursor
+
+GENERATION_KEY = 'feed-generation:{}'
+STATS_KINDS = ('index', 'group', 'profile')
+
+# Счётчик свой у каждого процесса, их сумму даёт core.metrics: общий
+# счётчик в кэше выстроил бы все запросы к лентам в очередь за incr.
+REQUESTS = Counter(
+    'yatube_feed_cache_requests_total',
+    'Обращения к кэшу фрагментов лент: попадания и промахи.',
+    labels=('kind', 'result'),
+)
+
+
+def generation(scope):
+    """Текущее поколение ленты; кэш хранит фрагменты только под ним.
+
+    Новое поколение заводится от текущего времени, поэтому даже после
+    вытеснения ключа из кэша старые фрагменты не всплывут снова.
+    """
+    key = GENERATION_KEY.format(scope)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def post_scopes(post, *group_ids):
+    """Ленты, в которых виден пост: общая, автора и его групп."""
+    group_ids = {post.group_id, *group_ids} - {None}
+    return [
+        'index',
+        f'profile:{post.author_id}',
+        *(f'group:{group_id}' for group_id in group_ids),
+    ]
+
+
+def page_params(request):
+    """page или cursor запроса в каноническом виде; None — не кэшировать.
+
+    Мусорные значения и далёкие страницы не должны заводить новых записей
+    в кэше на FEED_CACHE_TIMEOUT: такие страницы просто рисуются заново.
+    """
+    page = request.GET.get('page')
+    if page is not None:
+        if not page.isdigit():
+            return None
+        number = int(page)
+        if not 1 <= number <= settings.FEED_CACHE_MAX_PAGE:
+            return None
+        return f'page={number}'
+    cursor = request.GET.get('cursor')
+    if not cursor:
+        return ''
+    position = decode_cursor(cursor)
+    if position is None:
+        return None
+    backwards, pub_date, pk = position
+    if pub_date is None:
+        return CURSOR_LAST
+    direction = '<' if backwards else '>'
+    return f'{direction}{pub_date.isoformat()}|{pk}'
+
+
+def author_scopes(author_id):
+    """Ленты, где видно имя автора: общая, его профиль и его группы."""
+    group_ids = Post.objects.filter(
+        author_id=author_id, group__isnull=False
+    ).values_list('group_id', flat=True).distinct()
+    return [
+        'index',
+        f'profile:{author_id}',
+        *(f'group:{group_id}' for group_id in group_ids),
+    ]
+
+
+def group_scopes(group_id):
+    """Ленты, где видна группа: общая, её собственная и профили авторов."""
+    author_ids = Post.objects.filter(group_id=group_id).values_list(
+        'author_id', flat=True
+    ).distinct()
+    return [
+        'index',
+        f'group:{group_id}',
+        *(f'profile:{author_id}' for author_id in author_ids),
+    ]
+
+
+def fragment_key(scope, request):
+    params = page_params(request)
+    if params is None:
+        return None
+    digest = md5(params.encode()).hexdigest()
+    return f'feed:{scope}:{generation(scope)}:{digest}'
+
+
+def fragment(scope, request, render, protect=False):
+    """HTML страницы ленты из кэша; при промахе — render() и сохранение.
+
+    protect включает защиту от стампида (см. get_or_compute).
+    """
+    key = fragment_key(scope, request)
+    if key is None:
+        return render()
+    if protect:
+        value, hit = get_or_compute(key, render, settings.FEED_CACHE_TIMEOUT)
+        record(scope, hit)
+        return value
+    value = cache.get(key)
+    record(scope, hit=value is not None)
+    if value is None:
+        value = render()
+        cache.set(key, value, settings.FEED_CACHE_TIMEOUT)
+    return value
+
+
+def get_or_compute(key, compute, timeout, backend=None, beta=1.0):
+    """Кэш, который не пускает толпу считать одно и то же значение.
+
+    Значение хранится вместе со сроком годности и временем расчёта:
+    - пока оно свежее, его пересчитывают заранее с вероятностью, растущей
+      к концу срока (XFetch, beta задаёт агрессивность);
+    - просроченное ещё STAMPEDE_STALE_TIMEOUT секунд отдаётся тем, кто не
+      взял блокировку, пока её владелец пересчитывает значение;
+    - при полном промахе считает один запрос, остальные ждут его до
+      STAMPEDE_LOCK_TIMEOUT секунд.
+    Возвращает пару (значение, было ли попадание).
+    """
+    backend = backend or cache
+    envelope = backend.get(key)
+    if envelope is not None:
+        value, expires_at, delta = envelope
+        early = delta * beta * -math.log(1 - random.random())
+        if time.time() + early < expires_at:
+            return value, True
+        if not _lock(backend, key):
+            return value, True
+        return _compute(backend, key, compute, timeout), False
+    if _lock(backend, key):
+        return _compute(backend, key, compute, timeout), False
+    deadline = time.monotonic() + settings.STAMPEDE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(settings.STAMPEDE_POLL_INTERVAL)
+        envelope = backend.get(key)
+        if envelope is not None:
+            return envelope[0], True
+    return compute(), False
+
+
+def _lock(backend, key):
+    return backend.add(
+        f'{key}:lock', True, settings.STAMPEDE_LOCK_TIMEOUT
+    )
+
+
+def _compute(backend, key, compute, timeout):
+    try:
+        start = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - start
+        backend.set(
+            key,
+            (value, time.time() + timeout, delta),
+            timeout + settings.STAMPEDE_STALE_TIMEOUT,
+        )
+        return value
+    finally:
+        backend.delete(f'{key}:lock')
+
+
+def record(scope, hit):
+    REQUESTS.inc(kind=scope.split(':')[0], result='hit' if hit else 'miss')
+
+
+def stats():
+    """Попадания и промахи всех процессов: {'index': (hits, misses)}.
+
+    Данные других процессов видны с задержкой до METRICS_FLUSH_INTERVAL.
+    """
+    values = REGISTRY.collect()[REQUESTS.name]
+    return {
+        kind: (values.get((kind, 'hit'), 0), values.get((kind, 'miss'), 0))
+        for kind in STATS_KINDS
+    }
+
+
+def _hit_ratio():
+    return {
+        (kind,): hits / (hits + misses) if hits + misses else 0.0
+        for kind, (hits, misses) in stats().items()
+    }
+
+
+Gauge(
+    'yatube_feed_cache_hit_ratio', 'Доля попаданий в кэш фрагментов лент.',
+    _hit_ratio, labels=('kind',),
+)
@@ -0,0 +1,66 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def stats_for(user):
+    """Счётчики пользователя; для новичка без строки — нули."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user)
+
+
+def change(model, pk, **deltas):
+    """Атомарно сдвигает счётчики одной строки: UPDATE ... SET n = n + d.
+
+    Счётчик не уходит ниже нуля, а строка UserStats заводится только при
+    увеличении — удаление пользователя не должно её воскрешать.
+    """
+    if pk is None:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    floors = {
+        f'{field}__gte': -delta
+        for field, delta in deltas.items() if delta < 0
+    }
+    rows = model.objects.filter(pk=pk, **floors)
+    if not rows.update(**updates) and model is UserStats and not floors:
+        UserStats.objects.get_or_create(user_id=pk)
+        rows.update(**updates)
+
+
+def _count(model, field):
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(rows.values(field).annotate(n=Count('pk')).values('n')), 0
+    )
+
+
+def recount_users(pks):
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in pks], ignore_conflicts=True
+    )
+    UserStats.objects.filter(pk__in=pks).update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+
+
+def recount_groups(pks):
+    Group.objects.filter(pk__in=pks).update(posts_count=_count(Post, 'group'))
+
+
+def recount_posts(pks):
+    Post.objects.filter(pk__in=pks).update(
+        comments_count=_count(Comment, 'post')
+    )
+
+
+RECOUNTERS = {
+    'users': (User, recount_users),
+    'groups': (Group, recount_groups),
+    'posts': (Post, recount_posts),
+}
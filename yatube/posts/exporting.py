@@ -0,0 +1,99 @@
+"""Выгрузка всех постов и комментариев автора потоком.
+
+Строки читаются из базы через .iterator() порциями по CHUNK_SIZE и сразу
+кодируются, так что память не зависит от числа постов автора. Поля
+записей те же, что читает import_posts, а type различает посты и
+комментарии.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Post
+
+CHUNK_SIZE: int = 2000
+# Столько байт копится перед отдачей клиенту, чтобы не слать по строке.
+BUFFER_SIZE: int = 64 * 1024
+FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CSV_COLUMNS = (
+    'type', 'id', 'author', 'group', 'post', 'text', 'pub_date', 'created',
+)
+
+
+def records(author):
+    """Посты, затем комментарии автора — словарями в порядке id."""
+    posts = Post.objects.filter(author=author).order_by('pk').values_list(
+        'pk', 'group__slug', 'text', 'pub_date'
+    )
+    for pk, group, text, pub_date in posts.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            'type': 'post', 'id': pk, 'author': author.username,
+            'group': group, 'text': text, 'pub_date': pub_date.isoformat(),
+        }
+    comments = Comment.objects.filter(author=author).order_by(
+        'pk'
+    ).values_list('pk', 'post_id', 'text', 'created')
+    for pk, post_id, text, created in comments.iterator(
+        chunk_size=CHUNK_SIZE
+    ):
+        yield {
+            'type': 'comment', 'id': pk, 'author': author.username,
+            'post': post_id, 'text': text, 'created': created.isoformat(),
+        }
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class _Line:
+    """Файл для csv.writer, который просто возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(_Line(), CSV_COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склеивает строки в куски по size байт."""
+    buffer, length = [], 0
+    for line in lines:
+        chunk = line.encode()
+        buffer.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzipped(chunks):
+    """Сжимает поток кусков в gzip по ходу отдачи."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export(author, export_format='jsonl', gzip=False):
+    """Куски байт выгрузки автора в формате jsonl или csv."""
+    lines = jsonl_lines if export_format == 'jsonl' else csv_lines
+    chunks = buffered(lines(records(author)))
+    return gzipped(chunks) if gzip else chunks
+
+
+def filename(author, export_format, gzip=False):
+    return f'{author.username}.{export_format}' + ('.gz' if gzip else '')
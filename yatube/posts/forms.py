@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Comment, Post
+from . import images
+from .models import Comment, Group, Post, User
 
 
 class PostForm(forms.ModelForm):
@@ -22,6 +24,12 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError('Без текста нельзя, галупчик')
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return images.normalize(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -39,3 +47,17 @@ class CommentForm(forms.ModelForm):
         if not data:
             raise forms.ValidationError('Без текста нельзя, галупчик')
         return data
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Найти', max_length=200, required=False)
+    group = forms.ModelChoiceField(
+        Group.objects.all(), label='Группа', required=False
+    )
+    author = forms.ModelChoiceField(
+        User.objects.all(),
+        label='Автор',
+        required=False,
+        to_field_name='username',
+        widget=forms.TextInput,
+    )
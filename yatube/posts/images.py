@@ -0,0 +1,173 @@
+import base64
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+METADATA_FIELDS = (
+    'image_width', 'image_height', 'image_format', 'image_size', 'image_hash',
+    'image_placeholder', 'image_color',
+)
+EMPTY_METADATA = dict(
+    zip(METADATA_FIELDS, (None, None, '', None, '', '', ''))
+)
+
+
+def read_metadata(file):
+    """Размеры, формат, объём, sha256 и заглушка картинки для полей Post.
+
+    Файл читается кусками, целиком в память он не попадает; размеры Pillow
+    берёт из заголовка. Для нечитаемой картинки размеры, формат и
+    заглушка остаются пустыми.
+    """
+    digest, size = hashlib.sha256(), 0
+    for chunk in file.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    metadata = dict(EMPTY_METADATA, image_size=size)
+    metadata['image_hash'] = digest.hexdigest()
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            metadata['image_width'], metadata['image_height'] = image.size
+            metadata['image_format'] = image.format or ''
+            metadata.update(placeholder(image))
+    except (OSError, SyntaxError):
+        pass
+    file.seek(0)
+    return metadata
+
+
+def placeholder(image):
+    """Микрокопия картинки в data URI и её средний цвет.
+
+    Шаблоны подкладывают их фоном под <img>, так что до загрузки самой
+    картинки на месте уже есть её размытый силуэт — без лишних запросов.
+    """
+    edge = settings.POST_IMAGE_PLACEHOLDER_EDGE
+    image.draft('RGB', (edge, edge))
+    micro = ImageOps.exif_transpose(image)
+    if has_alpha(micro):
+        background = Image.new('RGBA', micro.size, 'white')
+        micro = Image.alpha_composite(background, micro.convert('RGBA'))
+    micro = micro.convert('RGB')
+    micro.thumbnail((edge, edge))
+    red, green, blue = micro.resize((1, 1), Image.BOX).getpixel((0, 0))
+    buffer = BytesIO()
+    micro.save(buffer, 'JPEG', quality=40)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return {
+        'image_placeholder': f'data:image/jpeg;base64,{encoded}',
+        'image_color': f'#{red:02x}{green:02x}{blue:02x}',
+    }
+
+
+def fill_metadata(post):
+    """Обновляет поля картинки поста, если в нём новый или пустой файл."""
+    if not post.image:
+        metadata = EMPTY_METADATA
+    elif not post.image._committed:
+        metadata = read_metadata(post.image)
+    else:
+        return
+    for field, value in metadata.items():
+        setattr(post, field, value)
+
+
+# Форматы, которые отдаются браузеру как есть; остальное перекодируется.
+WEB_FORMATS = {
+    'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp', 'AVIF': 'avif',
+}
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def save_options(image, image_format):
+    if image_format == 'JPEG':
+        return {
+            'quality': settings.POST_IMAGE_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if image_format in ('WEBP', 'AVIF'):
+        return {'quality': settings.POST_IMAGE_QUALITY, 'method': 4}
+    if image_format == 'GIF' and 'transparency' in image.info:
+        return {'optimize': True, 'transparency': image.info['transparency']}
+    return {'optimize': True}
+
+
+def _open_checked(upload):
+    """Открывает загрузку, проверив лимиты по размеру файла и заголовку."""
+    if upload.size > settings.POST_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Картинка больше %s' % filesizeformat(
+                settings.POST_IMAGE_MAX_BYTES
+            )
+        )
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, SyntaxError):
+        raise ValidationError('Не удалось прочитать картинку')
+    width, height = image.size
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        image.close()
+        raise ValidationError(f'Слишком большое разрешение: {width}×{height}')
+    return image
+
+
+def normalize(upload):
+    """Приводит загруженную картинку к виду, в котором её стоит хранить.
+
+    Лимиты на байты и пиксели проверяются до декодирования, по размеру
+    файла и заголовку. JPEG декодируется сразу в уменьшенном масштабе
+    (draft), так что пиковая память зависит от POST_IMAGE_MAX_EDGE, а не
+    от разрешения камеры. Затем картинка поворачивается по EXIF,
+    ужимается до POST_IMAGE_MAX_EDGE по длинной стороне и перекодируется
+    без метаданных. Результат пишется во временный файл, который держится
+    в памяти только до FILE_UPLOAD_MAX_MEMORY_SIZE.
+
+    Анимированные картинки только проверяются и сохраняются как есть.
+    """
+    with _open_checked(upload) as image:
+        if getattr(image, 'is_animated', False):
+            upload.seek(0)
+            return upload
+        source_format = image.format
+        edge = settings.POST_IMAGE_MAX_EDGE
+        if source_format == 'JPEG':
+            image.draft('RGB', (edge, edge))
+        try:
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((edge, edge), reducing_gap=3.0)
+        except (OSError, SyntaxError):
+            raise ValidationError('Не удалось прочитать картинку')
+    image_format = source_format
+    if image_format not in WEB_FORMATS:
+        image_format = 'PNG' if has_alpha(image) else 'JPEG'
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.info.pop('exif', None)
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, image_format, **save_options(image, image_format))
+    size = output.tell()
+    output.seek(0)
+    root = os.path.splitext(os.path.basename(upload.name))[0]
+    return UploadedFile(
+        output,
+        name=f'{root}.{WEB_FORMATS[image_format]}',
+        content_type=Image.MIME[image_format],
+        size=size,
+    )
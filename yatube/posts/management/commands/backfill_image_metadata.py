@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts.images import METADATA_FIELDS, read_metadata
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, формат, хеш и заглушки картинок '
+        'уже опубликованных постов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').exclude(image=None).filter(
+            Q(image_hash='') | Q(image_placeholder='')
+        ).order_by('pk').only('pk', 'image')
+        last_pk, done, missing = 0, 0, 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            filled = []
+            for post in batch:
+                try:
+                    with post.image.open('rb') as image:
+                        metadata = read_metadata(image)
+                except FileNotFoundError:
+                    missing += 1
+                    continue
+                for field, value in metadata.items():
+                    setattr(post, field, value)
+                filled.append(post)
+            Post.objects.bulk_update(filled, METADATA_FIELDS)
+            last_pk, done = batch[-1].pk, done + len(filled)
+            self.stdout.write(f'Обработано картинок: {done}')
+        if missing:
+            self.stdout.write(self.style.WARNING(f'Нет файлов: {missing}'))
+        self.stdout.write(self.style.SUCCESS(f'Готово: {done}'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporting
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Выгружает все посты и комментарии автора в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=exporting.FORMATS, default='jsonl'
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', help='Файл выгрузки; по умолчанию <username>.<format>'
+        )
+
+    def handle(self, *args, **options):
+        author = User.objects.filter(username=options['username']).first()
+        if author is None:
+            raise CommandError(f'Нет пользователя: {options["username"]}')
+        export_format, gzip = options['format'], options['gzip']
+        output = options['output'] or exporting.filename(
+            author, export_format, gzip
+        )
+        written = 0
+        with open(output, 'wb') as file:
+            for chunk in exporting.export(author, export_format, gzip):
+                file.write(chunk)
+                written += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f'{output}: {written} байт'))
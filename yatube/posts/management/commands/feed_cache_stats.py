@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import caching
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша лент'
+
+    def handle(self, *args, **options):
+        for kind, (hits, misses) in caching.stats().items():
+            total = hits + misses
+            ratio = hits / total if total else 0
+            self.stdout.write(
+                f'{kind}: попаданий {hits}, промахов {misses}, '
+                f'доля попаданий {ratio:.1%}'
+            )
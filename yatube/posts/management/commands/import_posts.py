@@ -0,0 +1,109 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from posts import caching, importing
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты, комментарии или подписки из JSONL/CSV '
+        'пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Файлы .jsonl или .csv')
+        parser.add_argument(
+            '--kind', choices=importing.IMPORTERS, default='posts',
+            help='Что лежит в файлах',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл прогресса: с ним повторный запуск продолжит с места '
+                 'остановки',
+        )
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='Заводить незнакомых авторов без пароля',
+        )
+        parser.add_argument(
+            '--no-recount', action='store_true',
+            help='Не пересчитывать счётчики после импорта',
+        )
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        self.checkpoint = options['checkpoint']
+        self.state = importing.load_checkpoint(self.checkpoint)
+        self.importer = importing.IMPORTERS[kind]()
+        self.resolver = importing.Resolver(options['create_users'])
+        self.scopes = {'index'}
+        self.start, self.total, self.rejected = time.monotonic(), 0, 0
+        self.imported = 0
+        with importing.original_dates():
+            for path in options['paths']:
+                self.import_file(path, options['batch_size'])
+        self.reset_sequences(self.importer.model)
+        caching.bump(*self.scopes)
+        if not options['no_recount']:
+            call_command(
+                'recount', *importing.RECOUNT_TARGETS[kind],
+                stdout=self.stdout,
+            )
+        if kind != 'comments':
+            self.stdout.write(
+                'Ленты подписок обновит manage.py rebuild_timelines'
+            )
+        if self.rejected:
+            self.stdout.write(
+                self.style.WARNING(f'Пропущено: {self.rejected}')
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {self.total} записей, добавлено {self.imported}, '
+            f'{self.rate():.0f} в секунду'
+        ))
+
+    def import_file(self, path, batch_size):
+        done = self.state.get(path, 0)
+        if done:
+            self.stdout.write(f'{path}: пропускаю {done} записей')
+        records = importing.read_records(path, skip=done)
+        for batch in importing.batches(records, batch_size):
+            with transaction.atomic():
+                objects, rejected = importing.import_batch(
+                    self.importer, batch, self.resolver
+                )
+            for record, reason in rejected:
+                self.stderr.write(f'{reason}: {record}')
+            if self.importer.model is Post:
+                for post in objects:
+                    self.scopes.update(caching.post_scopes(post))
+            done += len(batch)
+            self.total += len(batch)
+            self.imported += len(objects)
+            self.rejected += len(rejected)
+            if self.checkpoint:
+                self.state[path] = done
+                importing.save_checkpoint(self.checkpoint, self.state)
+            self.stdout.write(
+                f'Записей: {self.total}, {self.rate():.0f} в секунду'
+            )
+
+    def rate(self):
+        return self.total / max(time.monotonic() - self.start, 1e-9)
+
+    @staticmethod
+    def reset_sequences(model):
+        # Строки вставлялись с id старой платформы: счётчик id в базе
+        # (sequence в PostgreSQL) должен встать за максимальным.
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from posts import blobs
+from posts.models import Post
+from posts.storage import is_content_addressed
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые картинки постов в хранилище по содержимому'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        posts = Post.objects.exclude(image='').exclude(image=None).order_by(
+            'pk'
+        ).values_list('pk', 'image')
+        last_pk, moved, missing = 0, 0, 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, old_name in batch:
+                if is_content_addressed(old_name):
+                    continue
+                try:
+                    with storage.open(old_name, 'rb') as old:
+                        new_name = storage.save(old_name, old)
+                except FileNotFoundError:
+                    missing += 1
+                    continue
+                # update() не трогает pub_date и не шлёт сигналы ленты.
+                # Ссылку на new_name уже взяло хранилище при сохранении.
+                Post.objects.filter(pk=pk).update(image=new_name)
+                blobs.claim(new_name)
+                if not Post.objects.filter(image=old_name).exists():
+                    storage.delete(old_name)
+                moved += 1
+            self.stdout.write(f'Перенесено картинок: {moved}')
+        if missing:
+            self.stdout.write(self.style.WARNING(f'Нет файлов: {missing}'))
+        self.stdout.write(self.style.SUCCESS(f'Готово: {moved}'))
@@ -0,0 +1,38 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails, variants
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры и варианты для srcset картинок '
+        'уже опубликованных постов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').exclude(image=None).order_by(
+            'pk'
+        ).values_list('pk', 'image')
+        start, done, last_pk = time.monotonic(), 0, 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = list(
+                    images.filter(pk__gt=last_pk)[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                list(pool.map(thumbnails.generate, [n for _, n in batch]))
+                list(pool.map(variants.generate, [pk for pk, _ in batch]))
+                last_pk, done = batch[-1][0], done + len(batch)
+                self.stdout.write(f'Обработано картинок: {done}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - start:.1f} с'
+        ))
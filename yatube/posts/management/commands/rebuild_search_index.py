@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересоздаёт полнотекстовый индекс постов и его триггеры'
+
+    def handle(self, *args, **options):
+        if not search.available():
+            raise CommandError('Индекс FTS5 есть только у SQLite')
+        start = time.monotonic()
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - start:.1f} с'
+        ))
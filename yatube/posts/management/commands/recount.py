@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.counters import RECOUNTERS
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики порциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'targets', nargs='*',
+            help=f'Что пересчитать: {", ".join(RECOUNTERS)}; по умолчанию всё',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        unknown = set(options['targets']) - set(RECOUNTERS)
+        if unknown:
+            raise CommandError(f'Неизвестные счётчики: {", ".join(unknown)}')
+        for target in options['targets'] or RECOUNTERS:
+            model, recount = RECOUNTERS[target]
+            pks = model.objects.order_by('pk').values_list('pk', flat=True)
+            last_pk, done = 0, 0
+            while True:
+                chunk = list(pks.filter(pk__gt=last_pk)[:chunk_size])
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    recount(chunk)
+                last_pk, done = chunk[-1], done + len(chunk)
+            self.stdout.write(self.style.SUCCESS(f'{target}: {done}'))
@@ -0,0 +1,211 @@
+import heapq
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import partial, reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import SimpleLazyObject, cached_property
+
+ORDERING = ('-pub_date', '-id')
+CURSOR_LAST = 'last'
+
+
+def encode_cursor(post, backwards=False):
+    direction = '<' if backwards else '>'
+    raw = f'{direction}{post.pub_date.isoformat()}|{post.pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (backwards, pub_date, pk) или None для битого курсора."""
+    if cursor == CURSOR_LAST:
+        return True, None, None
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, position = raw[0], raw[1:]
+        pub_date, pk = position.rsplit('|', 1)
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (TypeError, ValueError, IndexError, UnicodeDecodeError):
+        return None
+    if direction not in '<>' or pub_date is None:
+        return None
+    return direction == '<', pub_date, pk
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id).
+
+    Страница выбирается одним запросом с LIMIT по индексу, без OFFSET и
+    без COUNT(*), поэтому стоит одинаково на любой глубине ленты.
+    """
+    keyset = True
+
+    def __init__(self, object_list, per_page):
+        super().__init__(object_list.order_by(*ORDERING), per_page)
+        self.num_pages = 1
+
+    def get_page(self, cursor):
+        return self.page(cursor)
+
+    def window(self, queryset, position):
+        """Срез queryset после курсора в направлении чтения."""
+        if position is None:
+            return queryset
+        backwards, pub_date, pk = position
+        if backwards:
+            queryset = queryset.reverse()
+        # Лишнее на вид условие pub_date__gte/lte даёт базе диапазон по
+        # индексу: по одному OR SQLite собирает все строки до курсора
+        # (MULTI-INDEX OR) и сортирует их целиком.
+        if pub_date is not None and backwards:
+            queryset = queryset.filter(pub_date__gte=pub_date).filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+            )
+        elif pub_date is not None:
+            queryset = queryset.filter(pub_date__lte=pub_date).filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+            )
+        return queryset
+
+    def fetch(self, position, limit):
+        return list(self.window(self.object_list, position)[:limit])
+
+    def page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        backwards = position is not None and position[0]
+        rows = self.fetch(position, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_previous = has_more
+            has_next = position[1] is not None
+        else:
+            has_previous, has_next = position is not None, has_more
+        number = 2 if has_previous else 1
+        self.num_pages = number + 1 if has_next else number
+        page = self._get_page(rows, number, self)
+        page.next_cursor = (
+            encode_cursor(rows[-1]) if has_next and rows else ''
+        )
+        page.previous_cursor = (
+            encode_cursor(rows[0], backwards=True)
+            if has_previous and rows else ''
+        )
+        return page
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Keyset-пагинация по нескольким источникам сразу.
+
+    Каждый источник отдаёт не больше страницы после курсора, а итоговая
+    страница собирается k-way слиянием через кучу (heapq.merge).
+    """
+
+    def __init__(self, sources, per_page):
+        self.sources = [source.order_by(*ORDERING) for source in sources]
+        super().__init__(self.sources[0], per_page)
+
+    def fetch(self, position, limit):
+        backwards = position is not None and position[0]
+        streams = [
+            self.window(source, position)[:limit] for source in self.sources
+        ]
+        merged = heapq.merge(
+            *streams, key=_sort_key, reverse=not backwards
+        )
+        rows, seen = [], set()
+        for post in merged:
+            if post.pk not in seen:
+                seen.add(post.pk)
+                rows.append(post)
+            if len(rows) == limit:
+                break
+        return rows
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки без COUNT(*) по всей таблице.
+
+    Без фильтров число строк оценивается по MAX(pk) — это один шаг по
+    индексу первичного ключа; удалённые строки оценку только завышают.
+    С фильтрами строки считаются не дальше COUNT_LIMIT: до таких страниц
+    всё равно никто не долистывает, а полный подсчёт на миллионах постов
+    стоит секунд.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = queryset.aggregate(estimate=Max('pk'))['estimate']
+            if (estimate or 0) > self.COUNT_LIMIT:
+                return estimate
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+
+def page_window(page, on_each_side=None, on_ends=None):
+    """Номера страниц для навигации: края и окно вокруг текущей.
+
+    Пропуски отмечаются None: для 100 страниц и текущей 50 получится
+    [1, None, 47, 48, 49, 50, 51, 52, 53, None, 100]. Повторяет
+    Paginator.get_elided_page_range из Django 3.2.
+    """
+    if on_each_side is None:
+        on_each_side = settings.PAGINATOR_ON_EACH_SIDE
+    if on_ends is None:
+        on_ends = settings.PAGINATOR_ON_ENDS
+    number, num_pages = page.number, page.paginator.num_pages
+    if num_pages <= (on_each_side + on_ends) * 2:
+        return list(range(1, num_pages + 1))
+    pages = []
+    if number > 1 + on_each_side + on_ends + 1:
+        pages += [*range(1, on_ends + 1), None]
+        pages += range(number - on_each_side, number + 1)
+    else:
+        pages += range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        pages += range(number + 1, number + on_each_side + 1)
+        pages += [None, *range(num_pages - on_ends + 1, num_pages + 1)]
+    else:
+        pages += range(number + 1, num_pages + 1)
+    return pages
+
+
+def _sort_key(post):
+    return post.pub_date, post.pk
+
+
+def paginate(request, queryset, per_page, sources=(), count=None):
+    """Страница ленты: по курсору, а для старых ссылок ?page=N — по номеру.
+
+    sources — дополнительные querysets, которые сливаются с основным;
+    count — известное заранее число записей вместо COUNT(*).
+    """
+    page_number = request.GET.get('page')
+    if page_number is not None:
+        if sources:
+            queryset = reduce(or_, sources, queryset).distinct()
+        paginator = Paginator(queryset.order_by(*ORDERING), per_page)
+        if count is not None:
+            paginator.count = count
+        return paginator.get_page(page_number)
+    if sources:
+        paginator = MergedCursorPaginator([queryset, *sources], per_page)
+    else:
+        paginator = CursorPaginator(queryset, per_page)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def lazy_page(request, queryset, per_page, **kwargs):
+    """Страница, которая выбирается из базы только при первом обращении.
+
+    Если шаблон отдаёт ленту из кэша фрагментов, запроса не будет вовсе.
+    """
+    return SimpleLazyObject(
+        partial(paginate, request, queryset, per_page, **kwargs)
+    )
@@ -0,0 +1,164 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+TABLE = 'posts_post_fts'
+# Маркеры подсветки — управляющие символы, которых нет в тексте постов:
+# сниппет сначала экранируется целиком, а потом они меняются на <mark>.
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 32
+
+SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+        AFTER INSERT ON posts_post BEGIN
+            INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+        AFTER DELETE ON posts_post BEGIN
+            INSERT INTO {TABLE}({TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+        AFTER UPDATE OF text ON posts_post BEGIN
+            INSERT INTO {TABLE}({TABLE}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text);
+        END""",
+]
+DROP = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    f'DROP TABLE IF EXISTS {TABLE}',
+]
+
+
+def available():
+    return connection.vendor == 'sqlite'
+
+
+def rebuild():
+    """Пересоздаёт индекс и триггеры и переиндексирует все посты.
+
+    Нужна и после миграций, которые пересобирают таблицу posts_post:
+    SQLite удаляет её триггеры вместе со старой таблицей.
+    """
+    with connection.cursor() as cursor:
+        for statement in DROP + SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def match_expression(query):
+    """Запрос пользователя в синтаксисе FTS5: все слова, последнее — префикс.
+
+    Операторы FTS5 из ввода не пропускаются, так что кривой запрос не
+    превращается в ошибку базы.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def matching(queryset, query):
+    """Посты queryset, подходящие под запрос, без ранжирования."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not available():
+        return queryset.filter(text__icontains=query)
+    # RawSQL в pk__in Django оборачивает во вторые скобки, и SQLite
+    # видит вместо подзапроса скалярное значение — только первую строку.
+    return queryset.extra(
+        where=[
+            f'"posts_post"."id" IN '
+            f'(SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s)'
+        ],
+        params=[expression],
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Найденные посты по релевантности (bm25) для Paginator.
+
+    Paginator спрашивает count() и срез; каждый срез — один запрос к
+    индексу с LIMIT/OFFSET и один запрос за самими постами. У постов в
+    срезе есть post.snippet — фрагмент текста с <mark> вокруг совпадений.
+    """
+
+    def __init__(self, query, group=None, author=None):
+        self.expression = match_expression(query)
+        self.filters, self.params = [], [self.expression]
+        if group is not None:
+            self.filters.append('post.group_id = %s')
+            self.params.append(group.pk)
+        if author is not None:
+            self.filters.append('post.author_id = %s')
+            self.params.append(author.pk)
+        self._count = None
+
+    def _from(self):
+        where = ' AND '.join([f'{TABLE} MATCH %s', *self.filters])
+        return (
+            f'FROM {TABLE} JOIN posts_post post ON post.id = {TABLE}.rowid '
+            f'WHERE {where}'
+        )
+
+    def count(self):
+        if self._count is None:
+            self._count = 0
+            if self.expression:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT COUNT(*) {self._from()}', self.params
+                    )
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.expression:
+            return []
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {TABLE}.rowid, snippet({TABLE}, 0, %s, %s, '…', %s) "
+                f'{self._from()} ORDER BY bm25({TABLE}) LIMIT %s OFFSET %s',
+                [MARK_START, MARK_END, SNIPPET_TOKENS, *self.params,
+                 max(stop - start, 0), start],
+            )
+            rows = cursor.fetchall()
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for pk, _ in rows]
+        )
+        results = []
+        for pk, snippet in rows:
+            if pk in posts:
+                posts[pk].snippet = highlight(snippet)
+                results.append(posts[pk])
+        return results
@@ -0,0 +1,166 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import blobs, caching, counters, images, tasks, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, которые выводятся в лентах.
+USER_FEED_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, **kwargs):
+    instance._old_group_id, instance._old_image = None, ''
+    if not instance._state.adding:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(pre_save, sender=Post)
+def store_image_metadata(sender, instance, **kwargs):
+    images.fill_metadata(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, **kwargs):
+    if created:
+        counters.change(UserStats, instance.author_id, posts_count=1)
+        counters.change(Group, instance.group_id, posts_count=1)
+    elif instance._old_group_id != instance.group_id:
+        counters.change(Group, instance._old_group_id, posts_count=-1)
+        counters.change(Group, instance.group_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    counters.change(UserStats, instance.author_id, posts_count=-1)
+    counters.change(Group, instance.group_id, posts_count=-1)
+
+
+def invalidate_feeds(scopes):
+    # Второй сдвиг после коммита выбрасывает фрагменты, которые успели
+    # отрисовать по старым данным, пока транзакция не закоммичена.
+    caching.bump(*scopes)
+    transaction.on_commit(lambda: caching.bump(*scopes))
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, **kwargs):
+    name = instance.image.name if instance.image else ''
+    if name != (instance._old_image or ''):
+        # Новую загрузку уже посчитало хранилище (blobs.pin).
+        if not blobs.claim(name):
+            blobs.retain(name)
+        blobs.release(instance._old_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if instance.image:
+        blobs.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post(sender, instance, **kwargs):
+    invalidate_feeds(caching.post_scopes(instance, instance._old_group_id))
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post(sender, instance, **kwargs):
+    invalidate_feeds(caching.post_scopes(instance))
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, update_fields=None, **kwargs):
+    instance._old_feed_fields = None
+    if instance._state.adding or (
+        update_fields is not None
+        and not set(update_fields) & set(USER_FEED_FIELDS)
+    ):
+        # Например, вход сохраняет только last_login.
+        return
+    instance._old_feed_fields = User.objects.filter(
+        pk=instance.pk
+    ).values_list(*USER_FEED_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_user(sender, instance, **kwargs):
+    old = getattr(instance, '_old_feed_fields', None)
+    current = tuple(getattr(instance, field) for field in USER_FEED_FIELDS)
+    if old is not None and old != current:
+        invalidate_feeds(caching.author_scopes(instance.pk))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_saved_group(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_feeds(caching.group_scopes(instance.pk))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_scopes(sender, instance, **kwargs):
+    # После удаления посты уже отвязаны от группы (SET_NULL) и сигналов
+    # Post не шлют, поэтому ленты собираются заранее.
+    instance._feed_scopes = caching.group_scopes(instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def invalidate_deleted_group(sender, instance, **kwargs):
+    invalidate_feeds(instance._feed_scopes)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.change(Post, instance.post_id, comments_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.change(Post, instance.post_id, comments_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.change(UserStats, instance.author_id, followers_count=1)
+        counters.change(UserStats, instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    author_id = instance.author_id
+    with transaction.atomic(savepoint=False):
+        # Строка автора блокируется, чтобы из одновременных отписок
+        # переход через FEED_PULL_THRESHOLD увидела ровно одна.
+        followers = UserStats.objects.select_for_update().filter(
+            pk=author_id
+        ).values_list('followers_count', flat=True).first()
+        counters.change(UserStats, author_id, followers_count=-1)
+        counters.change(UserStats, instance.user_id, following_count=-1)
+        if followers == settings.FEED_PULL_THRESHOLD:
+            tasks.resume_push.defer(author_id)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    # У популярного автора это тысячи строк: пусть вставляет воркер.
+    if created:
+        tasks.fan_out.defer(instance.pk, key=f'fan-out:{instance.pk}')
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    timeline.unfollow(instance.user_id, instance.author_id)
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+CONTENT_ADDRESSED_NAME = re.compile(
+    r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$'
+)
+
+
+def is_content_addressed(name):
+    """Файл назван по содержимому и никогда не меняется под этим именем."""
+    return bool(name and CONTENT_ADDRESSED_NAME.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под именем из sha256 содержимого: posts/ab/cd/<hash>.jpg.
+
+    Одинаковые загрузки ложатся в один файл: копия пишется во временный
+    файл с подсчётом хеша, а потом жёстко связывается с итоговым именем.
+    os.link не перезаписывает существующий файл, так что параллельные
+    загрузки одной картинки безопасны. Сколько постов ссылается на файл,
+    считает posts.blobs; сохранение сразу берёт ссылку на файл.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменит хеш, а совпадение имён — это дубликат.
+        return name
+
+    def _save(self, name, content):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.location)
+        digest = hashlib.sha256()
+        try:
+            with open(fd, 'wb') as tmp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            hexdigest = digest.hexdigest()
+            name = os.path.join(
+                directory, hexdigest[:2], hexdigest[2:4], hexdigest + extension
+            )
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            # Ссылка берётся до проверки файла: иначе blobs.collect() мог
+            # бы удалить уже найденный здесь файл.
+            from .blobs import pin
+            pin(name.replace('\\', '/'))
+            try:
+                os.link(tmp_path, full_path)
+            except FileExistsError:
+                pass
+        finally:
+            os.remove(tmp_path)
+        return name.replace('\\', '/')
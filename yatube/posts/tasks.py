@@ -0,0 +1,34 @@
+from jobs.registry import task
+
+from . import thumbnails, timeline, variants
+from .models import Post
+
+
+@task(priority=10)
+def generate_images(name, post_id):
+    """Миниатюры sorl и варианты для srcset новой картинки поста."""
+    thumbnails.generate(name)
+    variants.generate(post_id)
+
+
+def enqueue_images(post):
+    """Ставит обработку картинки в очередь вместе с сохранением поста."""
+    if not post.image:
+        return
+    generate_images.defer(
+        post.image.name, post.pk, key=f'images:{post.pk}:{post.image.name}'
+    )
+
+
+@task
+def fan_out(post_id):
+    """Раздаёт новый пост по лентам подписчиков (см. timeline.push_post)."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.push_post(post)
+
+
+@task
+def resume_push(author_id):
+    """Переносит недавние посты автора в ленты (см. timeline.resume_push)."""
+    timeline.resume_push(author_id)
@@ -0,0 +1,46 @@
+from django import template
+
+from posts import caching
+
+register = template.Library()
+
+
+class FeedCacheNode(template.Node):
+    def __init__(self, nodelist, kind, owner, protect):
+        self.nodelist = nodelist
+        self.kind = kind
+        self.owner = owner
+        self.protect = protect
+
+    def render(self, context):
+        scope = self.kind.resolve(context)
+        if self.owner is not None:
+            scope = f'{scope}:{self.owner.resolve(context)}'
+        return caching.fragment(
+            scope, context['request'], lambda: self.nodelist.render(context),
+            protect=self.protect,
+        )
+
+
+@register.tag
+def feed_cache(parser, token):
+    """Кэширует страницу ленты до следующей правки её постов.
+
+    {% feed_cache 'group' group.pk [protect] %} ... {% endfeed_cache %}
+
+    С protect фрагмент считается с защитой от стампида.
+    """
+    nodelist = parser.parse(('endfeed_cache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    protect = bits[-1] == 'protect'
+    if protect:
+        bits.pop()
+    if len(bits) not in (2, 3):
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} ожидает вид ленты и, возможно, её владельца'
+        )
+    owner = parser.compile_filter(bits[2]) if len(bits) == 3 else None
+    return FeedCacheNode(
+        nodelist, parser.compile_filter(bits[1]), owner, protect
+    )
@@ -0,0 +1,11 @@
+from django import template
+
+from posts import paginators
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_window(page, on_each_side=None, on_ends=None):
+    """{% page_window page_obj as pages %} — см. paginators.page_window."""
+    return paginators.page_window(page, on_each_side, on_ends)
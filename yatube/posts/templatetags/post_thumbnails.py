@@ -0,0 +1,74 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html
+from PIL import Image
+
+from posts import thumbnails, variants
+
+register = template.Library()
+
+
+@register.simple_tag
+def prefetch_thumbnails(posts, alias='list'):
+    """Готовит миниатюры и варианты картинок для всей страницы разом.
+
+    {% prefetch_thumbnails page_obj 'list' %}
+    """
+    thumbnails.prefetch(posts, alias)
+    variants.prefetch(posts)
+    return ''
+
+
+def srcset(image_variants):
+    return ', '.join(
+        f'{variant.image.url} {variant.width}w' for variant in image_variants
+    )
+
+
+@register.simple_tag
+def placeholder_style(post):
+    """style для <img>: средний цвет и микрокопия картинки фоном.
+
+    <img src="..." style="{% placeholder_style post %}">
+    """
+    if not post.image_color:
+        return ''
+    return format_html(
+        'background: {} url({}) center / cover no-repeat;',
+        post.image_color, post.image_placeholder,
+    )
+
+
+@register.inclusion_tag('includes/responsive_image.html')
+def responsive_image(post, sizes=None):
+    """<picture> с srcset по вариантам картинки поста.
+
+    {% responsive_image post ['(max-width: 576px) 100vw, 540px'] %}
+
+    Пока варианты не созданы, выводится миниатюра post.thumbnail, а пока
+    нет и её — заглушка картинки.
+    """
+    formats = variants.sources(post)
+    placeholder = placeholder_style(post)
+    if not formats:
+        return {
+            'thumbnail': getattr(post, 'thumbnail', None),
+            'placeholder': placeholder,
+            'pending': post.image_placeholder if post.image else '',
+            'width': post.image_width,
+            'height': post.image_height,
+        }
+    *modern, (_, fallback) = formats
+    largest = fallback[-1]
+    return {
+        'placeholder': placeholder,
+        'sources': [
+            {'type': Image.MIME[image_format], 'srcset': srcset(items)}
+            for image_format, items in modern
+        ],
+        'sizes': sizes or settings.POST_IMAGE_SIZES,
+        'src': largest.image.url,
+        'srcset': srcset(fallback),
+        'width': post.image_width or largest.width,
+        'height': post.image_height or largest.height,
+    }
@@ -0,0 +1,105 @@
+from unittest import mock
+
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+from posts.paginators import EstimatedCountPaginator
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_posts(self, count):
+        for number in range(count):
+            post = Post.objects.create(
+                author=self.admin, group=self.group, text=f'Пост {number}'
+            )
+            Comment.objects.create(
+                post=post, author=self.admin, text=f'Комментарий {number}'
+            )
+
+    def changelist_queries(self, url_name):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Число запросов списка постов и комментариев не зависит от строк"""
+        for url_name in (
+            'admin:posts_post_changelist', 'admin:posts_comment_changelist'
+        ):
+            with self.subTest(url_name=url_name):
+                Post.objects.all().delete()
+                self.create_posts(2)
+                few = self.changelist_queries(url_name)
+                self.create_posts(10)
+                self.assertEqual(self.changelist_queries(url_name), few)
+
+    def test_foreign_keys_use_autocomplete(self):
+        """Автор и группа выбираются автодополнением, а не списком"""
+        self.create_posts(1)
+        Group.objects.create(title='Другая группа', slug='other')
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, f'selected>{self.group.title}<')
+        self.assertNotContains(response, 'Другая группа')
+        post = Post.objects.get()
+        response = self.client.get(
+            reverse('admin:posts_post_change', args=(post.pk,))
+        )
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, 'Другая группа')
+
+    def test_search_uses_full_text_index(self):
+        """Поиск в админке находит посты через индекс"""
+        Post.objects.create(author=self.admin, text='Про котиков')
+        Post.objects.create(author=self.admin, text='Про собак')
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котик'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_estimated_count(self):
+        """Без фильтров число строк оценивается, с фильтрами ограничено"""
+        self.create_posts(3)
+        posts = site._registry[Post].get_queryset(None)
+        last = Post.objects.order_by('-pk').first()
+        with mock.patch.object(EstimatedCountPaginator, 'COUNT_LIMIT', 2):
+            unfiltered = EstimatedCountPaginator(posts.order_by('pk'), 1)
+            self.assertEqual(unfiltered.count, last.pk)
+            filtered = EstimatedCountPaginator(
+                posts.filter(group=self.group).order_by('pk'), 1
+            )
+            self.assertEqual(filtered.count, 2)
+
+    def test_dates_filter_by_range(self):
+        """Фильтр по дате — диапазон по индексу, без DISTINCT по таблице"""
+        self.create_posts(2)
+        for url_name, field in (
+            ('admin:posts_post_changelist', 'pub_date'),
+            ('admin:posts_comment_changelist', 'created'),
+        ):
+            with self.subTest(url_name=url_name):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(
+                        reverse(url_name), {f'{field}__gte': '2000-01-01'}
+                    )
+                self.assertEqual(response.context['cl'].result_count, 2)
+                self.assertFalse([
+                    query for query in context.captured_queries
+                    if 'DISTINCT' in query['sql']
+                ])
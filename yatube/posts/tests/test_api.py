@@ -0,0 +1,113 @@
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for num in range(12):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {num}'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response, json.loads(response.content)
+
+    def test_feeds_mirror_html_views(self):
+        """API отдаёт те же посты, что и HTML-ленты"""
+        self.client.force_login(self.reader)
+        feeds = {
+            'posts:api_index': ('posts:index', {}),
+            'posts:api_group_posts': (
+                'posts:group_posts', {'slug': self.group.slug}
+            ),
+            'posts:api_profile': (
+                'posts:profile', {'username': self.author.username}
+            ),
+            'posts:api_follow_index': ('posts:follow_index', {}),
+        }
+        for api_name, (html_name, kwargs) in feeds.items():
+            with self.subTest(api_name=api_name):
+                _, data = self.get(reverse(api_name, kwargs=kwargs))
+                html = self.client.get(reverse(html_name, kwargs=kwargs))
+                self.assertEqual(
+                    [row['id'] for row in data['results']],
+                    [post.pk for post in html.context['page_obj']],
+                )
+
+    def test_cursor_and_fields(self):
+        """Курсор листает ленту, ?fields= ограничивает поля"""
+        url = reverse('posts:api_index')
+        _, first = self.get(url, fields='id,author')
+        self.assertEqual(len(first['results']), 10)
+        self.assertEqual(
+            first['results'][0], {'id': first['results'][0]['id'],
+                                  'author': 'author'}
+        )
+        _, second = self.get(url, fields='id', cursor=first['next'])
+        self.assertEqual(len(second['results']), 2)
+        self.assertIsNone(second['next'])
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(len(set(ids)), 12)
+
+    def test_errors(self):
+        """Неизвестные поля, группа и гость получают JSON с ошибкой"""
+        cases = {
+            reverse('posts:api_index') + '?fields=id,password': 400,
+            reverse('posts:api_group_posts', kwargs={'slug': 'nope'}): 404,
+            reverse('posts:api_follow_index'): 401,
+        }
+        for url, status in cases.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('detail', json.loads(response.content))
+
+    def test_etag(self):
+        """If-None-Match даёт 304 без запросов, пока лента не менялась"""
+        url = reverse('posts:api_index')
+        response = self.client.get(url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_follows_renames(self):
+        """Смена имени автора или slug группы меняет ETag ленты"""
+        url = reverse('posts:api_index')
+        for obj, field, value in (
+            (User.objects.get(pk=self.author.pk), 'username', 'renamed'),
+            (Group.objects.get(pk=self.group.pk), 'slug', 'renamed'),
+        ):
+            with self.subTest(field=field):
+                etag = self.client.get(url)['ETag']
+                setattr(obj, field, value)
+                obj.save()
+                response, data = self.get(url)
+                self.assertNotEqual(response['ETag'], etag)
+                self.assertIn(value, json.dumps(data))
+
+    def test_follow_etag_from_body(self):
+        """Лента подписок проверяется по ETag содержимого"""
+        self.client.force_login(self.reader)
+        url = reverse('posts:api_follow_index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import caching
+from posts.models import Group, Post, User
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for num in range(12):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {num}'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_pages_are_cached_separately(self):
+        """Вторая страница не отдаёт закэшированную первую"""
+        first = self.client.get(reverse('posts:index')).content
+        second = self.client.get(reverse('posts:index'), {'page': 2}).content
+        self.assertIn('Пост 11'.encode(), first)
+        self.assertNotIn('Пост 11'.encode(), second)
+        self.assertIn('Пост 0'.encode(), second)
+
+    def test_cache_hit_skips_feed_query(self):
+        """Повторный запрос отдаёт ленту из кэша без запроса постов"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                with self.assertNumQueries(0 if url == urls[0] else 1):
+                    self.client.get(url)
+
+    def test_post_changes_invalidate_feeds(self):
+        """Новый, изменённый и удалённый посты видны сразу"""
+        url = reverse('posts:group_posts', args=[self.group.slug])
+        self.client.get(url)
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Свежий пост'
+        )
+        self.assertContains(self.client.get(url), 'Свежий пост')
+        post.text = 'Исправленный пост'
+        post.save()
+        self.assertContains(self.client.get(url), 'Исправленный пост')
+        post.delete()
+        self.assertNotContains(self.client.get(url), 'Исправленный пост')
+
+    def test_hits_and_misses_are_counted(self):
+        """Попадания и промахи считаются по видам лент"""
+        hits, misses = caching.stats()['index']
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(caching.stats()['index'], (hits + 1, misses + 1))
+
+    def test_user_and_group_changes_invalidate_feeds(self):
+        """Новое имя автора и удаление группы видны в лентах сразу"""
+        url = reverse('posts:index')
+        self.client.get(url)
+        self.author.first_name = 'Переименованный'
+        self.author.save()
+        self.assertContains(self.client.get(url), 'Переименованный')
+        group = Group.objects.create(title='Временная', slug='temporary')
+        Post.objects.create(author=self.author, group=group, text='В группе')
+        self.assertContains(self.client.get(url), '/group/temporary/')
+        group.delete()
+        self.assertNotContains(self.client.get(url), '/group/temporary/')
+
+    def test_login_does_not_invalidate_feeds(self):
+        """Вход пользователя (сохранение last_login) не сбрасывает ленты"""
+        generation = caching.generation('index')
+        self.client.force_login(self.author)
+        self.author.save(update_fields=['last_login'])
+        self.assertEqual(caching.generation('index'), generation)
+
+    def test_invalid_page_params_are_not_cached(self):
+        """Мусорные page и cursor рисуются без записи в кэш"""
+        counted = caching.stats()['index']
+        for params in ({'page': 'junk'}, {'page': 10 ** 6},
+                       {'cursor': 'junk'}):
+            with self.subTest(params=params):
+                self.client.get(reverse('posts:index'), params)
+                self.client.get(reverse('posts:index'), params)
+        self.assertEqual(caching.stats()['index'], counted)
@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def assertCounters(self):
+        self.author.stats.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.reader.stats.following_count, 1)
+        self.assertEqual(Post.objects.get().comments_count, 1)
+
+    def test_write_paths_update_counters(self):
+        """Счётчики обновляются при создании и удалении объектов"""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост', 'group': self.group.pk}
+        )
+        post = Post.objects.get()
+        self.author_client.post(
+            reverse('posts:add_comment', args=[post.pk]), {'text': 'Ок'}
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertCounters()
+        self.author_client.post(
+            reverse('posts:post_edit', args=[post.pk]),
+            {'text': 'Пост', 'group': self.other_group.pk}
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разъехавшиеся счётчики"""
+        post = Post.objects.create(author=self.author, group=self.group)
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(
+            posts_count=7, followers_count=0, following_count=3
+        )
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=5)
+        call_command('recount', '--chunk-size=1', stdout=StringIO())
+        self.assertCounters()
+
+    def test_profile_uses_counters(self):
+        """Профиль берёт число постов из счётчика, а не из COUNT(*)"""
+        Post.objects.create(author=self.author, text='Пост')
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        response = self.author_client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertEqual(response.context['posts_quantity'], 42)
@@ -0,0 +1,112 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import exporting
+from posts.models import Comment, Group, Post, User
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост, номер {num}'
+            )
+            for num in range(3)
+        ]
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Мой комментарий'
+        )
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.other, text='Чужой комментарий'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def export(self, **params):
+        url = reverse('posts:profile_export', args=(self.author.username,))
+        return self.client.get(url, params)
+
+    def test_jsonl(self):
+        """Выгрузка отдаётся потоком и содержит только записи автора"""
+        response = self.export()
+        self.assertTrue(response.streaming)
+        self.assertIn('author.jsonl', response['Content-Disposition'])
+        rows = [
+            json.loads(line)
+            for line in b''.join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [(row['type'], row['id']) for row in rows],
+            [('post', post.pk) for post in self.posts]
+            + [('comment', self.comment.pk)],
+        )
+        self.assertEqual(rows[0]['group'], 'group')
+        self.assertEqual(rows[-1]['post'], self.posts[0].pk)
+
+    def test_csv_gzip(self):
+        """CSV со сжатием на лету разжимается и читается"""
+        response = self.export(format='csv', gzip='1')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        rows = list(csv.DictReader(StringIO(content.decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1]['text'], 'Пост, номер 1')
+
+    def test_only_owner_or_staff(self):
+        """Чужие записи выгружает только персонал"""
+        self.client.force_login(self.other)
+        response = self.export()
+        self.assertRedirects(
+            response, reverse('posts:profile', args=(self.author.username,))
+        )
+        self.other.is_staff = True
+        self.other.save()
+        self.assertEqual(self.export().status_code, 200)
+
+    def test_round_trip_through_import(self):
+        """Выгрузка читается командой import_posts"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'author.jsonl')
+        call_command(
+            'export_posts', 'author', '--output', path, stdout=StringIO()
+        )
+        posts = [post.pk for post in self.posts]
+        Post.objects.filter(pk__in=posts).delete()
+        for kind in ('posts', 'comments'):
+            call_command(
+                'import_posts', path, f'--kind={kind}',
+                stdout=StringIO(), stderr=StringIO(),
+            )
+        self.assertEqual(
+            list(Post.objects.filter(author=self.author)
+                 .order_by('pk').values_list('pk', 'text')),
+            [(post.pk, post.text) for post in self.posts],
+        )
+        self.assertEqual(
+            list(Comment.objects.filter(author=self.author)
+                 .values_list('pk', 'post', 'text')),
+            [(self.comment.pk, self.posts[0].pk, self.comment.text)],
+        )
+
+    def test_buffered_chunks(self):
+        """Мелкие строки склеиваются в куски, а не идут по одной"""
+        chunks = list(exporting.buffered(['ab', 'cd', 'e'], size=4))
+        self.assertEqual(chunks, [b'abcd', b'e'])
@@ -0,0 +1,137 @@
+import hashlib
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageMetadataTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self):
+        return Post.objects.create(
+            author=self.author,
+            text='Пост',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def assertMetadata(self, post):
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertEqual(post.image_format, 'GIF')
+        self.assertEqual(post.image_size, len(SMALL_GIF))
+        self.assertEqual(
+            post.image_hash, hashlib.sha256(SMALL_GIF).hexdigest()
+        )
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        self.assertRegex(post.image_color, r'^#[0-9a-f]{6}$')
+
+    def test_upload_stores_metadata(self):
+        """Размеры и хеш картинки сохраняются при загрузке"""
+        post = self.create_post()
+        post.refresh_from_db()
+        self.assertMetadata(post)
+        post.image = None
+        post.save()
+        post.refresh_from_db()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_hash, '')
+
+    def test_placeholder_is_rendered_inline(self):
+        """Заглушка подставляется фоном картинки на странице поста"""
+        post = self.create_post()
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, post.image_placeholder)
+        self.assertContains(response, f'background: {post.image_color}')
+
+    def test_backfill_command(self):
+        """Команда заполняет метаданные картинок старых постов"""
+        post = self.create_post()
+        Post.objects.update(
+            image_width=None, image_height=None, image_format='',
+            image_size=None, image_hash='', image_placeholder='',
+            image_color='',
+        )
+        call_command('backfill_image_metadata', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertMetadata(post)
+
+
+def camera_jpeg(size=(400, 200), orientation=6):
+    """JPEG с EXIF-поворотом, как его сохраняет телефон."""
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = 'Camera'
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile('photo.jpeg', buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_EDGE=100)
+class ImageNormalizationTests(TestCase):
+    def submit(self, image):
+        return PostForm(data={'text': 'Пост'}, files={'image': image})
+
+    def test_upload_is_rotated_downsized_and_stripped(self):
+        """Картинка поворачивается по EXIF, ужимается и теряет EXIF"""
+        form = self.submit(camera_jpeg())
+        self.assertTrue(form.is_valid(), form.errors)
+        image_file = form.cleaned_data['image']
+        self.assertEqual(image_file.name, 'photo.jpg')
+        with Image.open(image_file) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (50, 100))
+            self.assertFalse(image.getexif())
+
+    def test_small_image_keeps_format(self):
+        """Маленькая картинка сохраняет формат и имя"""
+        form = self.submit(
+            SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['image'].name, 'small.gif')
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_byte_limit(self):
+        """Слишком тяжёлый файл отклоняется"""
+        form = self.submit(camera_jpeg())
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000)
+    def test_pixel_limit(self):
+        """Слишком большое разрешение отклоняется"""
+        form = self.submit(camera_jpeg())
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write(self, name, lines):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        return path
+
+    def jsonl(self, name, records):
+        return self.write(
+            name, [json.dumps(record, ensure_ascii=False)
+                   for record in records]
+        )
+
+    def run_import(self, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_posts(self):
+        """Посты вставляются с id и датами старой платформы"""
+        path = self.jsonl('posts.jsonl', [
+            {'id': 500, 'author': 'author', 'group': 'group',
+             'text': 'Старый пост про котиков',
+             'pub_date': '2015-03-01T10:00:00+00:00'},
+            {'id': 501, 'author': 'newcomer', 'text': 'Без группы'},
+            {'id': 502, 'author': 'author', 'group': 'nope', 'text': 'x'},
+            {'id': 503, 'author': 'ghost', 'text': 'x'},
+        ])
+        out, err = self.run_import(
+            path, '--batch-size=2', '--create-users'
+        )
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(
+            post.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(Post.objects.get(pk=501).author.username, 'newcomer')
+        self.assertFalse(Post.objects.filter(pk=502).exists())
+        self.assertTrue(Post.objects.filter(pk=503).exists())
+        self.assertIn('Нет группы: nope', err)
+        self.assertIn('Пропущено: 1', out)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        stats = UserStats.objects.get(pk=self.author.pk)
+        self.assertEqual(stats.posts_count, 1)
+        if search.available():
+            self.assertEqual(
+                list(search.matching(Post.objects.all(), 'котиков')),
+                [post],
+            )
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertGreater(new_post.pk, 503)
+
+    def test_rerun_and_checkpoint(self):
+        """Повтор не дублирует строки, checkpoint пропускает сделанное"""
+        path = self.write('posts.csv', [
+            'id,author,text',
+            '1,author,Первый',
+            '2,author,"Второй, с запятой"',
+            '3,author,Третий',
+        ])
+        checkpoint = os.path.join(self.dir, 'progress.json')
+        self.run_import(path, '--checkpoint', checkpoint, '--batch-size=2')
+        with open(checkpoint) as file:
+            self.assertEqual(json.load(file), {path: 3})
+        self.run_import(path)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Post.objects.get(pk=2).text, 'Второй, с запятой')
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write('4,author,Четвёртый\n')
+        Post.objects.filter(pk=1).delete()
+        out, _ = self.run_import(path, '--checkpoint', checkpoint)
+        self.assertIn('пропускаю 3 записей', out)
+        self.assertEqual(
+            sorted(Post.objects.values_list('pk', flat=True)), [2, 3, 4]
+        )
+
+    def test_taken_ids(self):
+        """Занятый другим содержимым id отклоняется, такой же — пропуск"""
+        post = Post.objects.create(author=self.author, text='Уже здесь')
+        path = self.jsonl('posts.jsonl', [
+            {'id': post.pk, 'author': 'author', 'text': 'Уже здесь'},
+            {'id': post.pk, 'author': 'author', 'text': 'Другой пост'},
+            {'id': 700, 'author': 'author', 'text': 'Новый'},
+            {'id': 700, 'author': 'author', 'text': 'Двойник'},
+            {'id': 701, 'author': 'author', 'text': 'С датой',
+             'pub_date': '2015-03-01T13:00:00+03:00'},
+        ])
+        self.run_import(path)
+        out, err = self.run_import(path)
+        self.assertEqual(Post.objects.get(pk=post.pk).text, 'Уже здесь')
+        self.assertEqual(Post.objects.get(pk=700).text, 'Новый')
+        self.assertEqual(err.count('уже занят другой записью'), 2)
+        self.assertIn('Другой пост', err)
+        self.assertIn('Двойник', err)
+        self.assertIn('Пропущено: 2', out)
+        self.assertIn('добавлено 0', out)
+
+    def test_comments_and_follows(self):
+        """Комментарии и подписки импортируются и пересчитывают счётчики"""
+        reader = User.objects.create_user(username='reader')
+        post = Post.objects.create(author=self.author, text='Пост')
+        comments = self.jsonl('comments.jsonl', [
+            {'id': 10, 'post': post.pk, 'author': 'reader', 'text': 'Да'},
+            {'post': post.pk, 'author': 'author', 'text': 'Нет'},
+            {'post': 99999, 'author': 'reader', 'text': 'Потерялся'},
+        ])
+        follows = self.jsonl('follows.jsonl', [
+            {'user': 'reader', 'author': 'author'},
+            {'user': 'reader', 'author': 'author'},
+            {'user': 'reader', 'author': 'reader'},
+        ])
+        _, err = self.run_import(comments, '--kind=comments')
+        self.assertIn('Нет поста: 99999', err)
+        self.run_import(follows, '--kind=follows')
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        self.assertEqual(
+            list(Follow.objects.values_list('user', 'author')),
+            [(reader.pk, self.author.pk)],
+        )
+        stats = UserStats.objects.get(pk=self.author.pk)
+        self.assertEqual(stats.followers_count, 1)
@@ -0,0 +1,76 @@
+import re
+
+from django.db import IntegrityError, connection
+from django.test import TestCase, skipUnlessDBFeature
+
+from posts.models import Follow, Group, Post, User
+from posts.paginators import (
+    ORDERING, CursorPaginator, decode_cursor, encode_cursor,
+)
+
+FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?\w+\s*$')
+TEMP_SORT = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group)
+
+    def assertUsesIndex(self, queryset, sorted_by_index=True):
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            self.assertNotRegex(line, FULL_SCAN, plan)
+        if sorted_by_index:
+            self.assertNotIn(TEMP_SORT, plan)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент читают индекс, а не всю таблицу"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('План проверяется только для SQLite')
+        querysets = {
+            'index': Post.objects.all(),
+            'group': self.group.posts.all(),
+            'profile': self.author.posts.all(),
+            'follow': Post.objects.filter(timeline_entries__user=self.user),
+            'comments': self.post.comments.order_by('created'),
+            'follow_lookup': Follow.objects.filter(
+                user=self.user, author=self.author
+            ),
+        }
+        for name, queryset in querysets.items():
+            with self.subTest(name=name):
+                if queryset.model is Post:
+                    queryset = queryset.order_by(*ORDERING)
+                # Лента подписок сортируется в памяти, но не больше
+                # TIMELINE_MAX_LENGTH строк одного читателя.
+                self.assertUsesIndex(
+                    queryset[:11], sorted_by_index=name != 'follow'
+                )
+
+    def test_cursor_window_uses_index_range(self):
+        """Страница после курсора читается диапазоном индекса"""
+        if connection.vendor != 'sqlite':
+            self.skipTest('План проверяется только для SQLite')
+        paginator = CursorPaginator(
+            Post.objects.select_related('author', 'group'), 10
+        )
+        for backwards in (False, True):
+            with self.subTest(backwards=backwards):
+                cursor = encode_cursor(self.post, backwards=backwards)
+                queryset = paginator.window(
+                    paginator.object_list, decode_cursor(cursor)
+                )
+                self.assertNotIn('MULTI-INDEX OR', queryset[:11].explain())
+                self.assertUsesIndex(queryset[:11])
+
+    def test_follow_is_unique(self):
+        """Повторная подписка отбивается ограничением в базе"""
+        Follow.objects.create(user=self.user, author=self.author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=self.user, author=self.author)
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post, User
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.strong = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Котики и ещё раз котики: про котиков <b>всё</b>',
+        )
+        cls.weak = Post.objects.create(
+            author=cls.other,
+            text='Длинный пост про собак, где котики упомянуты один раз '
+                 'среди множества других слов о прогулках и поводках',
+        )
+        Post.objects.create(author=cls.author, text='Про собак')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, **params):
+        return self.client.get(reverse('posts:search'), params)
+
+    def test_results_are_ranked_and_highlighted(self):
+        """Результаты упорядочены по релевантности и подсвечены"""
+        response = self.search(q='котик')
+        posts = list(response.context['page_obj'])
+        self.assertEqual(posts, [self.strong, self.weak])
+        self.assertIn('<mark>Котики</mark>', posts[0].snippet)
+        self.assertIn('&lt;b&gt;', posts[0].snippet)
+        self.assertContains(response, '<mark>котики</mark>')
+
+    def test_filters(self):
+        """Поиск фильтруется по группе и автору"""
+        by_group = self.search(q='котики', group=self.group.pk)
+        self.assertEqual(list(by_group.context['page_obj']), [self.strong])
+        by_author = self.search(q='котики', author='other')
+        self.assertEqual(list(by_author.context['page_obj']), [self.weak])
+
+    def test_index_follows_changes(self):
+        """Триггеры обновляют индекс при правке и удалении постов"""
+        weak = Post.objects.get(pk=self.weak.pk)
+        weak.text = 'Теперь только про попугаев'
+        weak.save()
+        self.assertEqual(len(search.SearchResults('котики')), 1)
+        self.assertEqual(len(search.SearchResults('попугаев')), 1)
+        Post.objects.filter(pk=self.strong.pk).delete()
+        self.assertEqual(len(search.SearchResults('котики')), 0)
+
+    def test_query_syntax_is_not_an_error(self):
+        """Операторы FTS5 во вводе не ломают поиск"""
+        response = self.search(q='("котики*')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['page_obj'].paginator.count, 2)
+        self.assertIsNone(self.search(q='').context['page_obj'])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через индекс"""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котики'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.strong, self.weak}
+        )
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс и триггеры"""
+        call_command('rebuild_search_index', stdout=StringIO())
+        Post.objects.create(author=self.author, text='Котики снова')
+        self.assertEqual(len(search.SearchResults('котики')), 3)
@@ -0,0 +1,75 @@
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, override_settings
+
+from core.cache_backends import AtomicFileBasedCache
+from posts.caching import get_or_compute
+
+
+@override_settings(STAMPEDE_LOCK_TIMEOUT=5, STAMPEDE_STALE_TIMEOUT=60)
+class StampedeTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.backends = {
+            'locmem': LocMemCache('stampede-tests', {}),
+            'filebased': AtomicFileBasedCache(self.directory, {}),
+        }
+        self.backends['locmem'].clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def slow_compute(self, calls):
+        def compute():
+            calls.append(threading.get_ident())
+            time.sleep(0.2)
+            return 'страница'
+        return compute
+
+    def test_single_flight(self):
+        """Из толпы одновременных промахов значение считает один поток"""
+        for name, backend in self.backends.items():
+            with self.subTest(backend=name):
+                calls, results = [], []
+                compute = self.slow_compute(calls)
+                threads = [
+                    threading.Thread(target=lambda: results.append(
+                        get_or_compute('feed', compute, 60, backend)[0]
+                    ))
+                    for _ in range(10)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                self.assertEqual(len(calls), 1)
+                self.assertEqual(results, ['страница'] * 10)
+
+    def test_stale_value_is_served_while_revalidating(self):
+        """Пока один поток пересчитывает, остальным отдаётся старое"""
+        for name, backend in self.backends.items():
+            with self.subTest(backend=name):
+                backend.set('feed', ('старая', time.time() - 1, 0.1), 60)
+                backend.add('feed:lock', True, 60)
+                calls = []
+                value, hit = get_or_compute(
+                    'feed', self.slow_compute(calls), 60, backend
+                )
+                self.assertEqual((value, hit, calls), ('старая', True, []))
+
+    def test_early_recomputation(self):
+        """Близкое к истечению значение пересчитывается заранее"""
+        for name, backend in self.backends.items():
+            with self.subTest(backend=name):
+                backend.set('feed', ('старая', time.time() + 1, 1000), 60)
+                calls = []
+                value, hit = get_or_compute(
+                    'feed', self.slow_compute(calls), 60, backend
+                )
+                self.assertEqual((value, hit), ('страница', False))
+                self.assertEqual(len(calls), 1)
+                self.assertIsNone(backend.get('feed:lock'))
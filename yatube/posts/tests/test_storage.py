@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+
+from posts import blobs
+from posts.models import MediaBlob, Post, User
+from posts.storage import is_content_addressed
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        self.storage = Post._meta.get_field('image').storage
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            author=self.author,
+            text='Пост',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом со счётчиком ссылок"""
+        first = self.create_post('one.gif')
+        second = self.create_post('two.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_content_addressed(first.image.name))
+        self.assertTrue(first.image.name.startswith('posts/'))
+        blob = MediaBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.refcount, 2)
+        first.delete()
+        self.assertTrue(self.storage.exists(second.image.name))
+        second.delete()
+        self.assertFalse(self.storage.exists(second.image.name))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_upload_survives_pending_collect(self):
+        """Сборка файла без ссылок не удаляет его из-под новой загрузки"""
+        post = self.create_post()
+        name = post.image.name
+        # Пост удалён, но collect() после коммита ещё не выполнился.
+        MediaBlob.objects.filter(name=name).update(refcount=0)
+        self.assertEqual(
+            self.storage.save('posts/again.gif', ContentFile(SMALL_GIF)),
+            name,
+        )
+        blobs.collect(name)
+        self.assertTrue(self.storage.exists(name))
+        self.assertTrue(blobs.claim(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+
+    def test_replacing_image_releases_old_file(self):
+        """Замена картинки освобождает старый файл"""
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = None
+        post.save()
+        self.assertFalse(self.storage.exists(old_name))
+
+    def test_migrate_command(self):
+        """Команда переносит старые файлы в хранилище по содержимому"""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        legacy = os.path.join(TEMP_MEDIA_ROOT, 'posts', 'old.gif')
+        with open(legacy, 'wb') as legacy_file:
+            legacy_file.write(SMALL_GIF)
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        Post.objects.filter(pk=post.pk).update(image='posts/old.gif')
+        call_command('migrate_media_storage', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(is_content_addressed(post.image.name))
+        self.assertFalse(self.storage.exists('posts/old.gif'))
+        self.assertEqual(
+            MediaBlob.objects.get(name=post.image.name).refcount, 1
+        )
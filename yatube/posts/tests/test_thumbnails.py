@@ -0,0 +1,165 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts import variants
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+# Без фонового пула: его потоки пишут в общую in-memory базу тестов
+# параллельно с запросом и ловят «database table is locked».
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, JOBS_EAGER=True)
+class ThumbnailsTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def assertThumbnailsReady(self, post):
+        ready = default.kvstore._get(
+            ImageFile(post.image).key, identity='thumbnails'
+        )
+        self.assertEqual(len(ready), len(settings.POST_THUMBNAILS))
+
+    def test_upload_enqueues_thumbnails(self):
+        """Миниатюры создаются в фоне после публикации поста"""
+        image = SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': image}
+        )
+        self.assertThumbnailsReady(Post.objects.get())
+
+    def test_pregenerate_command(self):
+        """Команда создаёт миниатюры для старых постов"""
+        post = Post.objects.create(
+            author=self.author,
+            text='Старый пост',
+            image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif'),
+        )
+        call_command(
+            'pregenerate_thumbnails', '--batch-size=1', stdout=StringIO()
+        )
+        self.assertThumbnailsReady(post)
+
+    def test_feed_reads_thumbnails_in_bulk(self):
+        """Лента читает все миниатюры страницы одним запросом"""
+        posts = [
+            Post.objects.create(
+                author=self.author,
+                text=f'Пост {index}',
+                image=SimpleUploadedFile(
+                    f'bulk{index}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            for index in range(3)
+        ]
+        # Один поток: общая in-memory SQLite тестов блокирует таблицы
+        # при параллельной записи.
+        call_command(
+            'pregenerate_thumbnails', '--workers=1', stdout=StringIO()
+        )
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        for table in ('thumbnail_kvstore', 'posts_imagevariant'):
+            lookups = [query for query in queries if table in query['sql']]
+            self.assertEqual(len(lookups), 1, table)
+        content = response.content.decode()
+        for post in response.context['page_obj']:
+            self.assertIsNotNone(post.thumbnail)
+            for variant in post.variants.all():
+                self.assertIn(variant.image.url, content)
+        self.assertEqual(len(response.context['page_obj']), len(posts))
+
+    @override_settings(JOBS_EAGER=False)
+    def test_feed_does_not_resize_images(self):
+        """Лента без готовых миниатюр показывает заглушку, а не режет
+        картинку в запросе"""
+        post = Post.objects.create(
+            author=self.author,
+            text='Ждёт воркера',
+            image=SimpleUploadedFile('pending.gif', SMALL_GIF, 'image/gif'),
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertIsNone(response.context['page_obj'][0].thumbnail)
+        self.assertFalse(
+            default.kvstore._get(ImageFile(post.image).key, 'thumbnails')
+        )
+        self.assertContains(response, post.image_placeholder)
+
+    def test_upload_creates_variants(self):
+        """После публикации в ленте появляется srcset из вариантов"""
+        image = SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': image}
+        )
+        post = Post.objects.get()
+        formats = set(post.variants.values_list('format', flat=True))
+        self.assertIn('WEBP', formats)
+        self.assertIn('JPEG', formats)
+        cache.clear()
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('type="image/webp"', content)
+        self.assertIn('loading="lazy"', content)
+        self.assertIn('width="2" height="1"', content)
+        self.assertIn(post.image_placeholder, content)
+
+    @override_settings(JOBS_EAGER=False)
+    def test_generated_variants_reach_cached_feed(self):
+        """Варианты видны в ленте, закэшированной до их создания"""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост',
+            image=SimpleUploadedFile('late.gif', SMALL_GIF, 'image/gif'),
+        )
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertNotIn('srcset', content)
+        variants.generate(post.pk)
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('srcset', content)
+
+    def test_variants_follow_image_changes(self):
+        """Варианты пересоздаются только при смене картинки"""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        variants.generate(post.pk)
+        first = set(post.variants.values_list('pk', flat=True))
+        variants.generate(post.pk)
+        self.assertEqual(
+            set(post.variants.values_list('pk', flat=True)), first
+        )
+        Post.objects.filter(pk=post.pk).update(image_hash='другая')
+        variants.generate(post.pk)
+        self.assertTrue(
+            first.isdisjoint(post.variants.values_list('pk', flat=True))
+        )
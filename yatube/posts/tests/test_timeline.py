@@ -0,0 +1,97 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+
+
+@override_settings(JOBS_EAGER=True)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.stranger = User.objects.create_user(username='stranger')
+        Post.objects.create(author=cls.author, text='До подписки')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_page(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return response.context['page_obj']
+
+    def test_follow_fills_and_unfollow_clears_timeline(self):
+        """Подписка переносит старые посты, отписка их убирает"""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(len(self.follow_page()), 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertEqual(len(self.follow_page()), 0)
+
+    def test_new_post_is_pushed_to_followers_only(self):
+        """Новый пост попадает только в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Свежий')
+        Post.objects.create(author=self.stranger, text='Чужой')
+        self.assertEqual(self.follow_page()[0], post)
+        self.assertEqual(len(self.follow_page()), 2)
+
+    @override_settings(TIMELINE_MAX_LENGTH=3, TIMELINE_TRIM_EVERY=1)
+    def test_timeline_is_capped(self):
+        """Лента не растёт дальше TIMELINE_MAX_LENGTH"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for num in range(5):
+            Post.objects.create(author=self.author, text=f'Пост {num}')
+        self.assertEqual(self.reader.timeline.count(), 3)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_timelines восстанавливает ленту"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(len(self.follow_page()), 1)
+
+    @override_settings(FEED_PULL_THRESHOLD=2)
+    def test_hybrid_feed_merges_pulled_authors(self):
+        """Посты популярного автора подмешиваются при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.stranger)
+        for num in range(6):
+            Post.objects.create(author=self.author, text=f'Звезда {num}')
+            Post.objects.create(author=self.stranger, text=f'Обычный {num}')
+        self.assertFalse(
+            self.reader.timeline.filter(
+                post__text__startswith='Звезда'
+            ).exists()
+        )
+        first_page = self.follow_page()
+        response = self.reader_client.get(
+            reverse('posts:follow_index'),
+            {'cursor': first_page.next_cursor}
+        )
+        posts = list(first_page) + list(response.context['page_obj'])
+        expected = list(
+            Post.objects.filter(author__following__user=self.reader)
+            .order_by('-pub_date', '-id')
+        )
+        self.assertEqual(posts, expected)
+
+    @override_settings(FEED_PULL_THRESHOLD=2)
+    def test_author_below_threshold_is_pushed_again(self):
+        """Посты времён популярности не пропадают, когда автор теряет её"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        post = Post.objects.create(author=self.author, text='Звезда')
+        self.assertFalse(self.reader.timeline.filter(post=post).exists())
+        Follow.objects.filter(user=self.stranger).delete()
+        self.assertTrue(self.reader.timeline.filter(post=post).exists())
+        self.assertIn(post, list(self.follow_page()))
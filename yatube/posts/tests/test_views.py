@@ -3,10 +3,13 @@ import tempfile
 
 from django import forms
 from django.conf import settings
-from django.test import Client, TestCase
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.test import Client, SimpleTestCase, TestCase
 from django.urls import reverse
 
 from posts.models import Group, Post, User
+from posts.paginators import page_window
 
 
 class PostViewsTests(TestCase):
@@ -200,3 +203,65 @@ class PaginatorViewsTest(TestCase):
                 response = self.guest_client.get((reverse_name) + '?page=2')
                 posts_qty = len(response.context['page_obj'])
                 self.assertEqual(posts_qty, 5)
+
+    def test_cursor_paginator(self):
+        """Курсор листает ленту без повторов и возвращается назад"""
+        response = self.guest_client.get(reverse('posts:index'))
+        first_page = response.context['page_obj']
+        self.assertTrue(first_page.has_next())
+        self.assertFalse(first_page.has_previous())
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': first_page.next_cursor}
+        )
+        second_page = response.context['page_obj']
+        self.assertEqual(len(second_page), 5)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(
+            set(first_page.object_list) & set(second_page.object_list)
+        )
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': second_page.previous_cursor}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']), list(first_page)
+        )
+
+    def test_cursor_paginator_last_and_broken(self):
+        """Курсоры last и битый не роняют страницу"""
+        cursors = {'last': 10, 'broken!': 10}
+        for cursor, expected in cursors.items():
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'cursor': cursor}
+                )
+                self.assertEqual(len(response.context['page_obj']), expected)
+
+
+class PageWindowTests(SimpleTestCase):
+    def setUp(self):
+        self.paginator = Paginator(range(1000), 10)
+
+    def test_window(self):
+        """Видны края и окно вокруг текущей страницы, пропуски — None"""
+        windows = {
+            1: [1, 2, 3, 4, None, 100],
+            50: [1, None, 47, 48, 49, 50, 51, 52, 53, None, 100],
+            100: [1, None, 97, 98, 99, 100],
+        }
+        for number, expected in windows.items():
+            with self.subTest(number=number):
+                page = self.paginator.page(number)
+                self.assertEqual(page_window(page), expected)
+        few = Paginator(range(30), 10).page(2)
+        self.assertEqual(page_window(few), [1, 2, 3])
+
+    def test_template_renders_window_only(self):
+        """Шаблон навигации не выводит ссылку на каждую страницу"""
+        html = render_to_string(
+            'includes/paginator.html',
+            {'page_obj': self.paginator.page(50), 'page_query': ''},
+        )
+        self.assertEqual(html.count('page-link" href="?page='), 12)
+        self.assertIn('href="?page=53"', html)
+        self.assertNotIn('href="?page=54"', html)
+        self.assertEqual(html.count('…'), 2)
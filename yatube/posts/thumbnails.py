@@ -0,0 +1,112 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.metrics import Histogram
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+GENERATION_SECONDS = Histogram(
+    'yatube_thumbnail_generation_seconds',
+    'Время создания всех миниатюр одной картинки.',
+)
+
+
+def generate(name):
+    """Создаёт все размеры из POST_THUMBNAILS для картинки поста.
+
+    Возвращает время работы в секундах; ошибки только логируются, чтобы
+    битая картинка не роняла воркер.
+    """
+    start = time.monotonic()
+    # Хранилище входит в ключ sorl: миниатюры ищутся по ImageFile(post.image).
+    source = ImageFile(name, Post._meta.get_field('image').storage)
+    try:
+        for geometry, options in settings.POST_THUMBNAILS.values():
+            get_thumbnail(source, geometry, **options)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', name)
+    finally:
+        close_old_connections()
+    duration = time.monotonic() - start
+    GENERATION_SECONDS.observe(duration)
+    return duration
+
+
+class Backend(ThumbnailBackend):
+    """Бэкенд sorl (THUMBNAIL_BACKEND), который умеет назвать миниатюру
+    без её создания.
+
+    Имя строится теми же методами, что и в get_thumbnail; подкласс
+    бэкенда — описанный в документации sorl способ их переопределять.
+    """
+
+    def thumbnail_name(self, source, geometry, options):
+        options = dict(options)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return self._get_thumbnail_filename(source, geometry, options)
+
+
+def thumbnail_name(source, geometry, options):
+    """Имя файла миниатюры — то же, что посчитал бы get_thumbnail."""
+    return default.backend.thumbnail_name(source, geometry, options)
+
+
+def _lookup(names):
+    """Записи KV-хранилища sorl для миниатюр одним чтением кэша и БД."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, KVStore):
+        return {name: kvstore.get(ImageFile(name)) for name in names}
+    keys = {add_prefix(ImageFile(name).key): name for name in names}
+    values = kvstore.cache.get_many(list(keys))
+    missing = [key for key in keys if not isinstance(values.get(key), str)]
+    if missing:
+        rows = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        kvstore.cache.set_many(rows, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(rows)
+    return {
+        name: deserialize_image_file(values[key])
+        for key, name in keys.items() if isinstance(values.get(key), str)
+    }
+
+
+def prefetch(posts, alias):
+    """Проставляет post.thumbnail для всех постов страницы разом.
+
+    Вместо поиска в KV-хранилище на каждый {% thumbnail %} все готовые
+    миниатюры читаются одним get_many и одним запросом к БД. Миниатюры
+    создаёт только задача generate_images: пока её нет, post.thumbnail
+    остаётся None и шаблон показывает заглушку картинки.
+    """
+    geometry, options = settings.POST_THUMBNAILS[alias]
+    names = {}
+    for post in posts:
+        post.thumbnail = None
+        if post.image:
+            source = ImageFile(post.image)
+            names[post] = thumbnail_name(source, geometry, options)
+    found = _lookup(set(names.values()))
+    for post, name in names.items():
+        post.thumbnail = found.get(name)
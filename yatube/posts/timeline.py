@@ -0,0 +1,153 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Subquery
+from django.utils import timezone
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE: int = 500
+
+
+def _entry(user_id, post):
+    return TimelineEntry(
+        user_id=user_id,
+        post_id=post.pk,
+        author_id=post.author_id,
+        pub_date=post.pub_date,
+    )
+
+
+def is_pulled(author_id):
+    """Авторы с числом подписчиков от порога не раздаются по лентам."""
+    return UserStats.objects.filter(
+        pk=author_id, followers_count__gte=settings.FEED_PULL_THRESHOLD
+    ).exists()
+
+
+def pulled_sources(user_id):
+    """Ленты популярных авторов, которые подмешиваются при чтении."""
+    pulled = UserStats.objects.filter(
+        user__following__user_id=user_id,
+        followers_count__gte=settings.FEED_PULL_THRESHOLD,
+    ).values_list('pk', flat=True)
+    since = timezone.now() - timedelta(days=settings.FEED_MERGE_WINDOW_DAYS)
+    return [
+        Post.objects.filter(
+            author_id=author_id, pub_date__gte=since
+        ).select_related('author', 'group')
+        for author_id in pulled
+    ]
+
+
+def trim(user_ids):
+    """Обрезает ленты до TIMELINE_MAX_LENGTH самых свежих записей.
+
+    По запросу на читателя: граница ищется один раз по индексу
+    (user, -pub_date), а не подзапросом для каждой строки его ленты.
+    """
+    length = settings.TIMELINE_MAX_LENGTH
+    for user_id in user_ids:
+        entries = TimelineEntry.objects.filter(user_id=user_id)
+        cutoff = entries.order_by('-pub_date').values('pub_date')[
+            length - 1:length
+        ]
+        entries.filter(pub_date__lt=Subquery(cutoff)).delete()
+
+
+def due_for_trim(user_ids):
+    """Случайная доля 1/TIMELINE_TRIM_EVERY читателей из user_ids.
+
+    Раздача поста добавляет в ленту одну строку, и обрезать все ленты
+    при каждом посте незачем: так лента в среднем перерастает
+    TIMELINE_MAX_LENGTH на TIMELINE_TRIM_EVERY строк, а обрезок на пост
+    во столько же раз меньше, чем подписчиков.
+    """
+    every = settings.TIMELINE_TRIM_EVERY
+    return [user_id for user_id in user_ids if random.randrange(every) == 0]
+
+
+@transaction.atomic
+def push_post(post):
+    """Fan-out on write: новый пост попадает в ленты всех подписчиков."""
+    if is_pulled(post.author_id):
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+    )
+    for start in range(0, len(follower_ids), BATCH_SIZE):
+        batch = follower_ids[start:start + BATCH_SIZE]
+        TimelineEntry.objects.bulk_create(
+            [_entry(user_id, post) for user_id in batch],
+            ignore_conflicts=True,
+        )
+        trim(due_for_trim(batch))
+
+
+def resume_push(author_id):
+    """Автор опустился ниже порога: посты, которые подмешивались при
+    чтении, раздаются в ленты подписчиков, иначе они пропадут из лент.
+
+    Берутся посты за FEED_MERGE_WINDOW_DAYS — ровно то, что видели
+    подписчики, пока автор был популярным.
+    """
+    if is_pulled(author_id):
+        return
+    since = timezone.now() - timedelta(days=settings.FEED_MERGE_WINDOW_DAYS)
+    posts = list(
+        Post.objects.filter(author_id=author_id, pub_date__gte=since)
+        .order_by('-pub_date')
+        .only('pk', 'author_id', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    )
+    if not posts:
+        return
+    follower_ids = list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    )
+    step = max(BATCH_SIZE // len(posts), 1)
+    for start in range(0, len(follower_ids), step):
+        batch = follower_ids[start:start + step]
+        with transaction.atomic():
+            TimelineEntry.objects.bulk_create(
+                [_entry(user_id, post)
+                 for user_id in batch for post in posts],
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            trim(batch)
+
+
+@transaction.atomic
+def follow(user_id, author_id):
+    """Подписка: свежие посты автора переносятся в ленту читателя."""
+    if is_pulled(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).only('pk', 'author_id', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for post in posts],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def unfollow(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild(user_id):
+    """Собирает ленту читателя заново из таблиц Follow и Post."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = Post.objects.filter(author__following__user_id=user_id).order_by(
+        '-pub_date'
+    ).only('pk', 'author_id', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [_entry(user_id, post) for post in posts], batch_size=BATCH_SIZE
+    )
@@ -0,0 +1,136 @@
+import logging
+import os
+import time
+from collections import defaultdict
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.db.models import prefetch_related_objects
+from PIL import Image
+
+from . import caching, images
+from .models import ImageVariant, Post
+
+logger = logging.getLogger(__name__)
+
+
+def formats(fallback):
+    """Форматы из POST_IMAGE_VARIANT_FORMATS, которые умеет Pillow.
+
+    Последним идёт запасной формат для браузеров без WebP и AVIF.
+    """
+    Image.init()
+    supported = [
+        name for name in settings.POST_IMAGE_VARIANT_FORMATS
+        if name in Image.SAVE and name != fallback
+    ]
+    return [*supported, fallback]
+
+
+def widths(source_width):
+    return sorted({
+        min(width, source_width)
+        for width in settings.POST_IMAGE_VARIANT_WIDTHS
+    })
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    options = images.save_options(image, image_format)
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def render(post):
+    """Несохранённые варианты картинки поста во всех ширинах и форматах."""
+    stem = os.path.splitext(os.path.basename(post.image.name))[0]
+    with post.image.open('rb'), Image.open(post.image) as source:
+        fallback = 'PNG' if images.has_alpha(source) else 'JPEG'
+        source = source.convert('RGBA' if fallback == 'PNG' else 'RGB')
+    variants = []
+    for width in widths(source.width):
+        height = max(round(source.height * width / source.width), 1)
+        resized = source.resize(
+            (width, height), Image.LANCZOS, reducing_gap=3.0
+        )
+        for image_format in formats(fallback):
+            variant = ImageVariant(
+                post=post, width=width, height=height, format=image_format,
+                source_hash=post.image_hash,
+            )
+            variant.image.save(
+                f'{stem}_{width}.{images.WEB_FORMATS[image_format]}',
+                ContentFile(_encode(resized, image_format)),
+                save=False,
+            )
+            variants.append(variant)
+    return variants
+
+
+def generate(post_id):
+    """Пересоздаёт варианты картинки поста, если они устарели, и сбрасывает
+    кэш лент с этим постом.
+
+    Возвращает время работы в секундах; ошибки только логируются.
+    """
+    start = time.monotonic()
+    try:
+        post = Post.objects.filter(pk=post_id).only(
+            'image', 'image_hash', 'author_id', 'group_id'
+        ).first()
+        if post is None:
+            return time.monotonic() - start
+        old = list(post.variants.all())
+        if post.image and old and all(
+            variant.source_hash == post.image_hash for variant in old
+        ):
+            return time.monotonic() - start
+        new = render(post) if post.image else []
+        with transaction.atomic():
+            ImageVariant.objects.filter(pk__in=[v.pk for v in old]).delete()
+            ImageVariant.objects.bulk_create(new)
+        # Фрагменты лент, отрисованные до появления вариантов (и миниатюр,
+        # которые generate_images создаёт раньше), остались бы без srcset.
+        caching.bump(*caching.post_scopes(post))
+        for variant in old:
+            variant.image.delete(save=False)
+    except Exception:
+        logger.exception('Не удалось создать варианты картинки %s', post_id)
+    finally:
+        close_old_connections()
+    return time.monotonic() - start
+
+
+def prefetch(posts):
+    """Загружает варианты картинок всех постов страницы одним запросом."""
+    with_images = [post for post in posts if post.image]
+    prefetch_related_objects(with_images, 'variants')
+
+
+def sources(post):
+    """Наборы srcset по форматам: [(формат, [варианты по ширине])].
+
+    Варианты от прежней картинки поста не показываются. Запасной формат
+    идёт последним, как его вернула formats().
+    """
+    if not post.image:
+        return []
+    by_format = defaultdict(list)
+    for variant in post.variants.all():
+        if variant.source_hash == post.image_hash:
+            by_format[variant.format].append(variant)
+    order = {
+        name: index
+        for index, name in enumerate(settings.POST_IMAGE_VARIANT_FORMATS)
+    }
+    return sorted(
+        (
+            (image_format, sorted(variants, key=lambda v: v.width))
+            for image_format, variants in by_format.items()
+        ),
+        key=lambda item: order.get(item[0], len(order)),
+    )
@@ -1,10 +1,14 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from requests import post
 
-from .forms import CommentForm, PostForm
+from . import counters, exporting, search, tasks, timeline
+from .forms import CommentForm, PostForm, SearchForm
 from .models import Follow, Group, Post, User
+from .paginators import lazy_page, paginate
 
 TOP_TEN: int = 10
 
@@ -12,10 +16,8 @@ TOP_TEN: int = 10
 def index(request):
     template = 'posts/index.html'
     title = 'Yatube главная'
-    post_list = Post.objects.order_by('-pub_date')
-    paginator = Paginator(post_list, TOP_TEN)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.select_related('author', 'group')
+    page_obj = lazy_page(request, post_list, TOP_TEN)
     context = {
         'title': title,
         'text': 'Это главная страница проекта Yatube',
@@ -28,10 +30,8 @@ def group_posts(request, slug):
     template = 'posts/group_list.html'
     title = 'Yatube группы'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.order_by('-pub_date')
-    paginator = Paginator(posts, TOP_TEN)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.select_related('author')
+    page_obj = lazy_page(request, posts, TOP_TEN, count=group.posts_count)
     context = {
         'title': title,
         'text': 'Здесь будет информация о группах проекта Yatube',
@@ -43,31 +43,93 @@ def group_posts(request, slug):
 
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts_quantity = author.posts.count()
-    post_list = author.posts.order_by('-pub_date')
-    paginator = Paginator(post_list, TOP_TEN)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    stats = counters.stats_for(author)
+    post_list = author.posts.select_related('group')
+    page_obj = lazy_page(
+        request, post_list, TOP_TEN, count=stats.posts_count
+    )
     context = {
         'author': author,
-        'posts_quantity': posts_quantity,
+        'stats': stats,
+        'posts_quantity': stats.posts_count,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@login_required
+def profile_export(request, username):
+    """Все посты и комментарии автора файлом, потоком без сборки в памяти.
+
+    Выгрузить можно только свои записи; персоналу — записи любого автора.
+    ?format=jsonl|csv, ?gzip=1 сжимает выгрузку на лету.
+    """
+    author = get_object_or_404(User, username=username)
+    if author != request.user and not request.user.is_staff:
+        return redirect('posts:profile', username)
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in exporting.FORMATS:
+        export_format = 'jsonl'
+    gzip = request.GET.get('gzip') == '1'
+    response = StreamingHttpResponse(
+        exporting.export(author, export_format, gzip),
+        content_type=(
+            'application/gzip' if gzip else exporting.FORMATS[export_format]
+        ),
+    )
+    name = exporting.filename(author, export_format, gzip)
+    response['Content-Disposition'] = f'attachment; filename="{name}"'
+    return response
+
+
+def search_posts(request):
+    template = 'posts/search.html'
+    form = SearchForm(request.GET or None)
+    page_obj = None
+    if form.is_valid() and form.cleaned_data['q']:
+        query = form.cleaned_data['q']
+        group, author = form.cleaned_data['group'], form.cleaned_data['author']
+        if search.available():
+            results = search.SearchResults(query, group=group, author=author)
+        else:
+            results = search.matching(
+                Post.objects.select_related('author', 'group'), query
+            )
+            if group is not None:
+                results = results.filter(group=group)
+            if author is not None:
+                results = results.filter(author=author)
+        page_obj = Paginator(results, TOP_TEN).get_page(
+            request.GET.get('page')
+        )
+    params = request.GET.copy()
+    params.pop('page', None)
+    context = {
+        'title': 'Поиск по постам',
+        'form': form,
         'page_obj': page_obj,
+        'page_query': f'{params.urlencode()}&' if params else '',
     }
     return render(request, template, context)
 
 
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    posts_quantity = post.author.posts.count()
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    stats = counters.stats_for(post.author)
+    comments = post.comments.select_related('author').order_by('created')
     form = CommentForm()
     context = {
         'post': post,
         'group': post.group,
         'author': post.author,
-        'posts_quantity': posts_quantity,
+        'stats': stats,
+        'posts_quantity': stats.posts_count,
         'form': form,
         'comments': comments,
     }
@@ -75,6 +137,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def post_create(request):
     template = 'posts/create_post.html'
     form = PostForm(
@@ -85,14 +148,16 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        tasks.enqueue_images(post)
         return redirect('posts:profile', request.user.username)
     return render(request, template, {'form': form})
 
 
 @login_required
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:profile', post_id)
     form = PostForm(
         request.POST or None,
@@ -102,6 +167,8 @@ def post_edit(request, post_id):
     if form.is_valid():
         post = form.save(commit=False)
         post.save()
+        if 'image' in form.changed_data:
+            tasks.enqueue_images(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'is_edit': True,
@@ -112,6 +179,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -131,10 +199,13 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     title = 'Ваши подписки'
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, TOP_TEN)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.filter(
+        timeline_entries__user=request.user
+    ).select_related('author', 'group')
+    page_obj = paginate(
+        request, post_list, TOP_TEN,
+        sources=timeline.pulled_sources(request.user.pk)
+    )
     context = {
         'title': title,
         'page_obj': page_obj,
@@ -143,6 +214,7 @@ def follow_index(request):
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -154,12 +226,12 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follow_obj = Follow.objects.filter(
-        user=request.user,
-        author=author
-    )
-    if author != request.user and follow_obj.exists():
-        follow_obj.delete()
+    if author != request.user:
+        Follow.objects.filter(
+            user=request.user,
+            author=author
+        ).delete()
     return redirect('posts:profile', username=username)
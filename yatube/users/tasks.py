@@ -0,0 +1,11 @@
+from django.core.mail import EmailMultiAlternatives
+
+from jobs.registry import task
+
+
+@task(priority=20)
+def send_mail(subject, body, from_email, to, html_message=None):
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html_message:
+        message.attach_alternative(html_message, 'text/html')
+    message.send()
@@ -4,6 +4,7 @@ from django.contrib.auth.views import (LoginView, LogoutView,
 from django.urls import path
 
 from . import views
+from .forms import QueuedPasswordResetForm
 
 app_name = 'users'
 
@@ -21,9 +22,19 @@ urlpatterns = [
     ),
     path(
         'change_password/',
-        PasswordResetView.as_view(template_name='password_change_form'),
+        PasswordResetView.as_view(
+            template_name='password_change_form',
+            form_class=QueuedPasswordResetForm,
+        ),
         name='password_change'
     ),
+    # Перекрывает password_reset из django.contrib.auth.urls: письмо
+    # отправляет воркер очереди, а не запрос.
+    path(
+        'password_reset/',
+        PasswordResetView.as_view(form_class=QueuedPasswordResetForm),
+        name='password_reset'
+    ),
     path(
         'password_changed/',
         PasswordChangeDoneView.as_view(template_name='password_change_done'),
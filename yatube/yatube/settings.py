@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -20,6 +21,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'jobs.apps.JobsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -30,6 +32,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,7 +48,10 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
+        # Алиас по умолчанию взялся бы из пути к классу; engines['django']
+        # должен находить этот движок, как и до замены.
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -61,6 +68,8 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+TEST_RUNNER = 'core.testing.TestRunner'
+
 
 DATABASES = {
     'default': {
@@ -116,8 +125,100 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+POST_IMAGE_MAX_EDGE = 1920
+POST_IMAGE_QUALITY = 85
+POST_IMAGE_PLACEHOLDER_EDGE = 16
+
+# AVIF создаётся, только если его умеет сохранять установленный Pillow.
+POST_IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+POST_IMAGE_VARIANT_FORMATS = ('AVIF', 'WEBP')
+POST_IMAGE_SIZES = '(max-width: 576px) 100vw, 540px'
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.Backend'
+POST_THUMBNAILS = {
+    'list': ('100x100', {'crop': 'center'}),
+    'detail': ('300x300', {'crop': 'center'}),
+}
+
+TIMELINE_MAX_LENGTH = 1000
+# При раздаче поста лента подписчика обрезается с вероятностью
+# 1/TIMELINE_TRIM_EVERY (см. posts.timeline.due_for_trim).
+TIMELINE_TRIM_EVERY = 50
+FEED_PULL_THRESHOLD = 10000
+FEED_MERGE_WINDOW_DAYS = 30
+FEED_CACHE_TIMEOUT = 60 * 60 * 3
+# Страницы ?page= дальше этой в кэш фрагментов не попадают.
+FEED_CACHE_MAX_PAGE = 50
+# Навигация по страницам: столько номеров вокруг текущей и на краях.
+PAGINATOR_ON_EACH_SIDE = 3
+PAGINATOR_ON_ENDS = 1
+STAMPEDE_LOCK_TIMEOUT = 10
+STAMPEDE_POLL_INTERVAL = 0.05
+STAMPEDE_STALE_TIMEOUT = 60
+
+# Фоновые задачи (приложение jobs, воркеры — manage.py run_workers).
+# JOBS_EAGER выполняет задачу сразу при постановке, без очереди.
+JOBS_EAGER = False
+JOBS_WORKERS = 4
+JOBS_POLL_INTERVAL = 1
+JOBS_LEASE = 60 * 10
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+JOBS_KEEP_DONE = 60 * 60 * 24
+
+# Строка в логе core.middleware (уровень INFO) и заголовок Server-Timing
+# для INTERNAL_IPS и персонала. Замеряется доля запросов
+# SERVER_TIMING_SAMPLE_RATE: при отладке каждый, в продакшене каждый сотый.
+SERVER_TIMING_ENABLED = True
+SERVER_TIMING_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+
+# Метрики в формате Prometheus на /metrics/ (только для INTERNAL_IPS и
+# персонала). Процессы сбрасывают их в METRICS_DIR не реже чем раз в
+# METRICS_FLUSH_INTERVAL секунд.
+METRICS_ENABLED = True
+METRICS_NAMESPACES = ('posts', 'users', 'about')
+METRICS_DIR = os.path.join(tempfile.gettempdir(), 'yatube_metrics')
+METRICS_FLUSH_INTERVAL = 5
+INTERNAL_IPS = ['127.0.0.1']
+# Обратные прокси: за ними REMOTE_ADDR — адрес самого прокси, и адрес
+# клиента для INTERNAL_IPS берётся из X-Forwarded-For (см. README).
+TRUSTED_PROXIES = [] if DEBUG else ['127.0.0.1']
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 1,
+            # По поколениям лент сбрасывается кэш: их читаем только из
+            # общего кэша, чтобы сброс был виден всем процессам сразу.
+            'SHARED_ONLY': ['feed-generation:'],
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.AtomicFileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'yatube_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
 }